@@ -0,0 +1,547 @@
+import os
+import time
+import asyncio
+import logging
+import aiohttp
+from aiohttp import web
+from crafty_api import CraftyAPI
+from minecraft_broadcaster import MinecraftBroadcaster
+from broadcast_scheduler import BroadcastScheduler
+from poller import StatsPoller
+from controllers import AnnouncementMerger, create_controllers
+from health import ServiceHealth
+from metrics import REGISTRY, CRAFTY_REQUEST_SECONDS
+from timeseries import ServerTimeSeries
+from web_server import HeartbeatWebServer, negotiate_encoding
+from main import ControllerLoop
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.async_runtime')
+
+class AsyncCraftyAPI(CraftyAPI):
+    """Class to interact with Crafty Controller API from an asyncio event loop
+    
+    Shares configuration, token handling, retry decisions, the circuit
+    breaker, the inventory cache and response parsing with CraftyAPI; only
+    the I/O is done with aiohttp instead of requests.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        """Initialize the client; the HTTP session is created inside the running loop"""
+        super().__init__(*args, **kwargs)
+        self.login_lock = asyncio.Lock()
+        self.refresh_wake = asyncio.Event()
+        self.refresh_task = None
+    
+    def _create_session(self):
+        """The aiohttp session needs a running loop, see _get_session()"""
+        return None
+    
+    def _get_session(self):
+        """Get the pooled keep-alive aiohttp session, creating it if needed"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ssl=False)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+    
+    async def close(self):
+        """Stop the token refresher and close all pooled connections"""
+        self.closed = True
+        if self.refresh_task:
+            self.refresh_task.cancel()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def login(self, force=False):
+        """Authenticate with Crafty Controller to get an API token
+        
+        Same single-flight and backoff behaviour as CraftyAPI.login().
+        """
+        if not force and self._token_valid():
+            return True
+        
+        generation = self.token_generation
+        async with self.login_lock:
+            skipped = self._login_skipped(force, generation)
+            if skipped is not None:
+                return skipped
+            return self._login_finished(await self._login())
+    
+    async def _login(self):
+        """Request a new API token from Crafty Controller"""
+        try:
+            logger.info("Authenticating with Crafty Controller")
+            self.logins.inc()
+            started = time.perf_counter()
+            try:
+                async with self._get_session().post(
+                    f"{self.api_url}/auth/login",
+                    json={"username": self.username, "password": self.password}
+                ) as response:
+                    self._record_outcome(response.status)
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+            finally:
+                self.login_seconds.observe(time.perf_counter() - started)
+            
+            return self._accept_login(data)
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return self._login_error(e, isinstance(e, aiohttp.ClientResponseError))
+    
+    def _schedule_refresh(self):
+        """Make sure the background token refresher is running and knows the new expiry"""
+        if self.refresh_task and not self.refresh_task.done():
+            self.refresh_wake.set()
+            return
+        
+        self.refresh_task = asyncio.get_running_loop().create_task(self._refresh_token_loop())
+    
+    async def _refresh_token_loop(self):
+        """Renew the token shortly before it expires so requests never wait for a login"""
+        while not self.closed:
+            if self._refresh_wait() <= 0:
+                delay = self._refresh_delay(await self.login(force=True))
+            else:
+                delay = self._refresh_delay()
+            
+            try:
+                await asyncio.wait_for(self.refresh_wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self.refresh_wake.clear()
+    
+    async def _make_request(self, endpoint, method="GET", data=None, metric_label=None, on_not_found=None):
+        """Make a request to the Crafty API, retrying like CraftyAPI._make_request()"""
+        url = f"{self.api_url}/{endpoint.lstrip('/')}"
+        latency = CRAFTY_REQUEST_SECONDS.labels(self.name, metric_label or endpoint)
+        
+        for attempt in range(self.max_retries + 1):
+            # Fail fast while Crafty is known to be down
+            if not self.breaker.allow_request():
+                logger.debug(f"Crafty is unreachable, skipping request to {endpoint}")
+                return None
+            
+            if not self._token_valid() and not await self.login():
+                logger.error("Failed to authenticate, cannot make API request")
+                return None
+            
+            token = self.token
+            try:
+                started = time.perf_counter()
+                try:
+                    async with self._get_session().request(
+                        method, url, headers={"Authorization": f"Bearer {token}"}, json=data
+                    ) as response:
+                        self._record_outcome(response.status)
+                        response.raise_for_status()
+                        payload = await response.json(content_type=None)
+                finally:
+                    latency.observe(time.perf_counter() - started)
+                
+                return self._unwrap(payload)
+            
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = e.status if isinstance(e, aiohttp.ClientResponseError) else None
+                delay = self._request_failed(endpoint, e, status, token, attempt, on_not_found)
+                if delay is None:
+                    return None
+                if delay:
+                    await asyncio.sleep(delay)
+        
+        logger.error(f"Giving up on {endpoint} after {self.max_retries + 1} attempts")
+        return None
+    
+    async def get_servers(self, force=False):
+        """Fetch the list of servers, served from the INVENTORY_TTL cache like CraftyAPI.get_servers()"""
+        cached = self._cached_inventory(force)
+        if cached is not None:
+            return cached
+        return self._store_inventory(await self._make_request("servers"))
+    
+    async def get_server_stats(self, server_id):
+        """Get stats for a specific server"""
+        return await self._make_request(
+            f"servers/{server_id}/stats",
+            metric_label="servers/{id}/stats",
+            on_not_found=lambda: self._server_not_found(server_id)
+        )
+    
+    async def get_server_snapshot(self, server_id):
+        """Get the running flag and server info from a single stats request"""
+        return self._snapshot(await self.get_server_stats(server_id))
+
+class AsyncStatsPoller(StatsPoller):
+    """Class to poll server stats concurrently as tasks on the event loop
+    
+    POLL_WORKERS bounds the number of requests in flight instead of the number of threads.
+    """
+    
+    def __init__(self, crafty, max_workers=None, deadline=None):
+        """Initialize the poller with a bounded number of concurrent requests"""
+        super().__init__(crafty, max_workers, deadline)
+        self.semaphore = asyncio.Semaphore(self.max_workers)
+    
+    async def _fetch(self, server_id):
+        """Fetch one server's snapshot once a request slot is free"""
+        async with self.semaphore:
+            return await self.crafty.get_server_snapshot(server_id)
+    
+    async def poll(self, server_ids, on_fetched=None):
+        """Fetch a snapshot for every server concurrently, see StatsPoller.poll()"""
+        start = time.monotonic()
+        probed = await self._probe_async(server_ids) if self.slp_mode == "primary" else {}
+        fetched = await self._fetch_all_async([server_id for server_id in server_ids if server_id not in probed],
+                                              on_fetched)
+        if self.slp_mode == "fallback":
+            probed = await self._probe_async([server_id for server_id, (_, info) in fetched.items() if info is None])
+        return self._collect(server_ids, fetched, probed, start)
+    
+    async def _probe_async(self, server_ids):
+        """Run the selector-based Server List Ping prober off the event loop"""
+        return await asyncio.to_thread(self._probe, server_ids)
+    
+    async def _fetch_all_async(self, server_ids, on_fetched=None):
+        """Ask Crafty for every server's snapshot; returns {server ID: (running, info)}"""
+        tasks = [(server_id, asyncio.ensure_future(self._fetch(server_id))) for server_id in server_ids]
+        if on_fetched is not None:
+            for server_id, task in tasks:
+                task.add_done_callback(self._fetched_callback(server_id, on_fetched))
+        done = set()
+        if tasks:
+            done, _ = await asyncio.wait([task for _, task in tasks], timeout=self.deadline)
+        
+        fetched = {}
+        for server_id, task in tasks:
+            fetched[server_id] = (False, None)
+            if task in done:
+                try:
+                    fetched[server_id] = task.result()
+                except Exception as e:
+                    logger.error(f"Error polling server {server_id}: {e!r}")
+            else:
+                # Don't wait for it; reuse what we knew last cycle
+                task.cancel()
+                logger.warning(f"Stats for server {server_id} missed the {self.deadline}s deadline")
+        return fetched
+    
+    @staticmethod
+    def _fetched_callback(server_id, on_fetched):
+        """Wrap `on_fetched` as a task done callback that skips failed and cancelled fetches"""
+        def callback(task):
+            if not task.cancelled() and task.exception() is None:
+                on_fetched(server_id, *task.result())
+        return callback
+
+class AsyncBroadcastScheduler(BroadcastScheduler):
+    """Class to re-announce the active servers from a task on the event loop
+    
+    The broadcaster's sockets are non-blocking, so sending never stalls the loop.
+    """
+    
+    def __init__(self, broadcaster, interval=None):
+        """Initialize the scheduler for the given broadcaster"""
+        super().__init__(broadcaster, interval)
+        self.wake = asyncio.Event()
+        self.task = None
+    
+    def start(self):
+        """Start announcing in a task"""
+        if self.task and not self.task.done():
+            logger.warning("Broadcast scheduler is already running")
+            return
+        
+        self.running = True
+        self.wake.clear()
+        self._take_added(tick=True)
+        self.task = asyncio.get_running_loop().create_task(self._run())
+        
+        logger.info("Broadcast scheduler started")
+    
+    def is_alive(self):
+        """Check whether the announcing task is running"""
+        return self.running and self.task is not None and not self.task.done()
+    
+    async def stop(self):
+        """Stop announcing and wait for the task to finish"""
+        self.running = False
+        self.wake.set()
+        if self.task:
+            await self.task
+    
+    async def _run(self):
+        """Announce every server each tick, and added servers as soon as they come in"""
+        loop = asyncio.get_running_loop()
+        while self.running:
+            next_tick = loop.time() + self.interval
+            
+            self._take_added(tick=True)
+            self.broadcaster.broadcast_many(self.get_servers())
+            
+            while self.running and loop.time() < next_tick:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), next_tick - loop.time())
+                except asyncio.TimeoutError:
+                    pass
+                self.wake.clear()
+                added = self._take_added()
+                if added:
+                    self.broadcaster.broadcast_many(added)
+
+class AsyncStreamSubscriber:
+    """A connected event stream client served from the event loop"""
+    
+    def __init__(self, max_pending):
+        """Initialize the subscriber's queue"""
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = False
+    
+    def push(self, event):
+        """Queue an event; returns False if the client has fallen behind"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+class AsyncWebServer:
+    """Class to serve the heartbeat dashboard and API with aiohttp
+    
+    Log storage, ETags and event formatting are shared with HeartbeatWebServer;
+    this class only replaces the Flask routes and the WSGI server.
+    """
+    
+    def __init__(self, heartbeat_server):
+        """Initialize the aiohttp application around a HeartbeatWebServer's state"""
+        self.state = heartbeat_server
+        # Streams don't hold a worker thread here, so far more clients can be served
+        self.state.max_stream_clients = int(os.environ.get("MAX_STREAM_CLIENTS", "100"))
+        self.template_folder = heartbeat_server.template_folder
+        self.app = web.Application()
+        self.app.router.add_get('/', self.home)
+        self.app.router.add_get('/api/logs', self.get_logs)
+        self.app.router.add_get('/api/stream', self.stream)
+        self.app.router.add_get('/metrics', self.metrics)
+        self.app.router.add_get('/api/status', self.get_status)
+        self.app.router.add_get('/api/history', self.get_history)
+        self.app.router.add_get('/healthz', self.healthz)
+        self.app.router.add_get('/readyz', self.readyz)
+        self.runner = None
+    
+    @staticmethod
+    def _int_arg(request, name, default=None):
+        """Read an integer query parameter, ignoring malformed values like Flask's type=int"""
+        try:
+            return int(request.query[name])
+        except (KeyError, ValueError):
+            return default
+    
+    @staticmethod
+    def _number_arg(request, name):
+        """Read a numeric query parameter, ignoring malformed values like Flask's type=float"""
+        try:
+            return float(request.query[name])
+        except (KeyError, ValueError):
+            return None
+    
+    async def home(self, request):
+        """Main page with heartbeat logs"""
+        return web.FileResponse(os.path.join(self.template_folder, 'index.html'))
+    
+    async def get_logs(self, request):
+        """API endpoint to get logs as JSON, answering 304 while the window is unchanged
+        
+        Serves the same cached, optionally compressed bodies as the threaded
+        server. Building a body can read the on-disk history, decode it and
+        compress the result, so that runs in a worker thread to keep the loop free.
+        """
+        limit = self._int_arg(request, 'limit', 100)
+        since = self._int_arg(request, 'since')
+        start = self._number_arg(request, 'from')
+        end = self._number_arg(request, 'to')
+        
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        
+        cached = self.state.cached_logs_body(limit, since, start, end, encoding)
+        if cached is None:
+            cached = await asyncio.to_thread(self.state.logs_body, limit, since, start, end, encoding)
+        body, content_encoding = cached
+        
+        etag = self.state.logs_etag(limit, since, start, end, content_encoding)
+        if any(tag.value == etag for tag in request.if_none_match or ()):
+            response = web.Response(status=304)
+        else:
+            response = web.Response(body=body, content_type='application/json')
+            if content_encoding:
+                response.headers['Content-Encoding'] = content_encoding
+        
+        response.etag = etag
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+    
+    async def stream(self, request):
+        """Server-Sent Events stream pushing each new heartbeat"""
+        since = request.headers.get('Last-Event-ID')
+        since = int(since) if since and since.isdigit() else self._int_arg(request, 'since')
+        
+        # Subscribe before replaying so no heartbeat falls in between
+        subscriber = self.state._subscribe(AsyncStreamSubscriber(self.state.stream_queue_size))
+        if subscriber is None:
+            # The dashboard falls back to polling
+            return web.Response(text="Too many stream clients", status=503, headers={'Retry-After': '30'})
+        
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        try:
+            await response.prepare(request)
+            await response.write(b"retry: 5000\n\n")
+            
+            last_sent = 0
+            for seq, event in self.state.replay_events(since):
+                last_sent = seq
+                await response.write(event.encode())
+            
+            while self.state.running and not subscriber.dropped:
+                try:
+                    seq, payload = await asyncio.wait_for(subscriber.queue.get(), self.state.stream_keepalive)
+                except asyncio.TimeoutError:
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                
+                if seq > last_sent:
+                    await response.write(self.state._format_event(seq, payload).encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            self.state._unsubscribe(subscriber)
+        return response
+    
+    async def metrics(self, request):
+        """Prometheus metrics endpoint"""
+        return web.Response(body=REGISTRY.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4'})
+    
+    async def get_history(self, request):
+        """API endpoint to get aggregated player counts per server"""
+        return web.json_response(self.state.get_history(
+            request.query.get('server') or None,
+            self._number_arg(request, 'from'),
+            self._number_arg(request, 'to'),
+            self._number_arg(request, 'step')
+        ))
+    
+    async def get_status(self, request):
+        """API endpoint to get current status"""
+        return web.json_response(self.state.get_status())
+    
+    async def healthz(self, request):
+        """Liveness probe: 503 once broadcasting stopped or a controller loop stalled"""
+        alive, payload = self.state.get_liveness()
+        return web.json_response(payload, status=200 if alive else 503)
+    
+    async def readyz(self, request):
+        """Readiness probe: 503 until a controller has polled every server in its list"""
+        ready, payload = self.state.get_readiness()
+        return web.json_response(payload, status=200 if ready else 503)
+    
+    async def start(self):
+        """Start serving on the event loop"""
+        if not os.path.exists(self.template_folder):
+            logger.warning(f"Templates directory {self.template_folder} does not exist")
+            logger.warning("Creating default templates...")
+            self.state._create_template_files()
+        
+        self.state.running = True
+        self.runner = web.AppRunner(self.app, access_log=None, shutdown_timeout=1)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.state.host, self.state.port).start()
+        
+        logger.info(f"Web server started on http://{self.state.host}:{self.state.port} (aiohttp)")
+    
+    async def stop(self):
+        """Stop the web server"""
+        self.state.running = False
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+        if self.state.history:
+            self.state.history.close()
+
+async def run():
+    """Check server status and broadcast active servers from a single event loop
+    
+    Mirrors main.main(): polling, announcing and the web server all run as
+    tasks on one loop instead of in their own threads, with one polling task
+    per controller.
+    """
+    # Get configuration from environment
+    check_interval = int(os.environ.get("CHECK_INTERVAL", "30"))
+    enable_web_server = os.environ.get("ENABLE_WEB_SERVER", "true").lower() in ("true", "1", "yes")
+    
+    # Initialize one API client and poller per controller, and the shared broadcaster
+    controllers = create_controllers(AsyncCraftyAPI, AsyncStatsPoller)
+    timeseries = ServerTimeSeries()
+    broadcaster = MinecraftBroadcaster()
+    scheduler = AsyncBroadcastScheduler(broadcaster)
+    merger = AnnouncementMerger(controllers, scheduler)
+    health = ServiceHealth(controllers, scheduler, check_interval=check_interval)
+    
+    web_server = None
+    http_server = None
+    if enable_web_server:
+        web_server = HeartbeatWebServer(timeseries=timeseries, health=health)
+        http_server = AsyncWebServer(web_server)
+    
+    logger.info("Starting Minecraft server broadcaster (asyncio runtime)...")
+    logger.info(f"Check interval: {check_interval} seconds")
+    logger.info(f"Broadcast interval: {scheduler.interval} seconds")
+    
+    # Announce from the start; servers are added as soon as they are found running
+    scheduler.start()
+    
+    # Controllers log in and fetch their server lists while the web server starts;
+    # failures are retried, not fatal
+    tasks = [asyncio.create_task(run_controller(controller, merger, web_server, timeseries, check_interval))
+             for controller in controllers]
+    try:
+        if http_server:
+            await http_server.start()
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await scheduler.stop()
+        broadcaster.close()
+        for controller in controllers:
+            await controller.crafty.close()
+        if http_server:
+            await http_server.stop()
+
+async def run_controller(controller, merger, web_server, timeseries, check_interval):
+    """Poll one controller forever, like main.run_controller() but awaiting Crafty"""
+    loop = ControllerLoop(controller, merger, web_server, timeseries, check_interval)
+    
+    while True:
+        loop.begin()
+        try:
+            if loop.inventory_due():
+                retry = loop.apply_inventory(await controller.crafty.get_servers())
+                if retry is not None:
+                    await asyncio.sleep(retry)
+                    continue
+            
+            # Poll only the servers that are due, within the request budget
+            due = controller.poll_scheduler.pop_due()
+            if due:
+                loop.apply_poll(await controller.poller.poll(due, loop.on_fetched()))
+            loop.finish(due)
+        
+        except Exception as e:
+            loop.failed(e)
+        
+        await asyncio.sleep(loop.wait())
@@ -0,0 +1,68 @@
+"""Measure LAN announcement packets/second before and after socket reuse
+
+Usage: python benchmarks/bench_broadcast.py [servers] [rounds]
+"""
+import os
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from minecraft_broadcaster import MinecraftBroadcaster  # noqa: E402
+
+
+def legacy_broadcast(target, motd, port):
+    """The original per-call implementation: new socket and fresh encoding every time"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    announcement = f"[MOTD]{motd}[/MOTD][AD]{port}[/AD]"
+    data = bytearray([0x00, 0x00]) + struct.pack('>h', len(announcement)) + announcement.encode('utf-8')
+    sock.sendto(data, target)
+    sock.close()
+
+
+def measure(label, func, packets):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>16}: {packets} packets in {elapsed:.3f}s ({packets / elapsed:,.0f} packets/s)")
+    return packets / elapsed
+
+
+def main():
+    server_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    
+    # Local sink so packets have somewhere to go
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    target = sink.getsockname()
+    
+    servers = [(f"Server {i}", MinecraftBroadcaster.generate_motd(f"Server {i}", ""), 25565 + i)
+               for i in range(server_count)]
+    packets = server_count * rounds
+    
+    def run_legacy():
+        for _ in range(rounds):
+            for _, motd, port in servers:
+                legacy_broadcast(target, motd, port)
+    
+    broadcaster = MinecraftBroadcaster(broadcast_ip=target[0], broadcast_port=target[1])
+    
+    def run_broadcast_many():
+        for _ in range(rounds):
+            broadcaster.broadcast_many(servers)
+    
+    before = measure("per-call socket", run_legacy, packets)
+    after = measure("broadcast_many", run_broadcast_many, packets)
+    print(f"speedup: {after / before:.2f}x")
+    
+    broadcaster.close()
+    sink.close()
+
+
+if __name__ == "__main__":
+    main()
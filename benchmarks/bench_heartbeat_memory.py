@@ -0,0 +1,146 @@
+"""Compare the memory held by retained heartbeats built from dicts and from status records
+
+Usage: python benchmarks/bench_heartbeat_memory.py [heartbeats] [events_per_heartbeat]
+
+Each heartbeat records player count changes for a few servers, decoded from
+a fresh stats response like every poll cycle, and all of them stay in the
+heartbeat buffer. The dict variant copies the strings into every event, as
+heartbeats did before status records; the record variant is what the
+tracker produces now. Also times the per-cycle comparison of unchanged
+statuses. Exits non-zero if the records don't use less memory.
+"""
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from heartbeat_buffer import HeartbeatBuffer  # noqa: E402
+from server_state import ServerStateTracker  # noqa: E402
+from server_status import ServerSnapshot, ServerStatus  # noqa: E402
+
+SERVER_COUNT = 50
+
+
+def stats_response(server_id, online):
+    """Encoded Crafty stats response, decoded again per cycle so its strings are fresh objects"""
+    return json.dumps({
+        "server_id": {"server_id": server_id, "server_name": f"Survival world {server_id}"},
+        "running": True,
+        "server_port": 25565 + int(server_id),
+        "desc": "A Minecraft Server with a fairly long description for the lobby",
+        "version": "1.20.4",
+        "online": online,
+        "max": 20,
+    }).encode()
+
+
+def parse_dict(stats):
+    """Server info as a plain dict, the way it was parsed before status records"""
+    server_info = stats.get("server_id", {})
+    return {
+        "name": server_info.get("server_name", "Unknown Server"),
+        "port": stats.get("server_port", 25565),
+        "description": stats.get("desc", "A Minecraft Server"),
+        "version": stats.get("version", "Unknown"),
+        "max_players": stats.get("max", 20),
+        "online_players": stats.get("online", 0),
+    }
+
+
+def changed_servers(cycle, events_per_heartbeat):
+    """IDs and player counts of the servers that change in a cycle"""
+    for i in range(events_per_heartbeat):
+        server_id = str((cycle * events_per_heartbeat + i) % SERVER_COUNT)
+        yield server_id, cycle + 1
+
+
+def fill_with_dicts(heartbeats, events_per_heartbeat):
+    buffer = HeartbeatBuffer(heartbeats)
+    for cycle in range(heartbeats):
+        events = []
+        for server_id, online in changed_servers(cycle, events_per_heartbeat):
+            info = parse_dict(json.loads(stats_response(server_id, online)))
+            events.append({
+                "event": "players",
+                "id": server_id,
+                "name": info["name"],
+                "port": info["port"],
+                "online": info["online_players"],
+                "max": info["max_players"]
+            })
+        buffer.append({"timestamp": "2024-01-01 00:00:00", "data": {"events": events, "total_active": SERVER_COUNT}})
+    return buffer
+
+
+def fill_with_records(heartbeats, events_per_heartbeat):
+    buffer = HeartbeatBuffer(heartbeats)
+    tracker = ServerStateTracker()
+    tracker.update({str(i): ServerSnapshot(True, ServerStatus.from_stats(json.loads(stats_response(str(i), 0))))
+                    for i in range(SERVER_COUNT)})
+    for cycle in range(heartbeats):
+        snapshots = {}
+        for server_id, online in changed_servers(cycle, events_per_heartbeat):
+            snapshots[server_id] = ServerSnapshot(True, ServerStatus.from_stats(
+                json.loads(stats_response(server_id, online))))
+        events = tracker.update(snapshots)
+        buffer.append({"timestamp": "2024-01-01 00:00:00", "data": {"events": events, "total_active": SERVER_COUNT}})
+    return buffer, tracker
+
+
+def measure(fill, *args):
+    """Return (bytes allocated and still held, result of fill)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fill(*args)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held, result
+
+
+def time_comparisons(rounds):
+    """Time comparing every server's status with the previous cycle's, nothing changed"""
+    responses = [stats_response(str(i), 5) for i in range(SERVER_COUNT)]
+    old_dicts = [parse_dict(json.loads(r)) for r in responses]
+    new_dicts = [parse_dict(json.loads(r)) for r in responses]
+    old_records = [ServerStatus.from_stats(json.loads(r)) for r in responses]
+    new_records = [ServerStatus.from_stats(json.loads(r)) for r in responses]
+    
+    timings = {}
+    for label, old, new in (("dicts", old_dicts, new_dicts), ("records", old_records, new_records)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for a, b in zip(old, new):
+                if a != b:
+                    raise AssertionError("statuses should be equal")
+        timings[label] = (time.perf_counter() - start) / (rounds * len(old)) * 1e9
+    return timings
+
+
+def main():
+    heartbeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    events_per_heartbeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    logging.disable(logging.INFO)
+    
+    dict_bytes, _ = measure(fill_with_dicts, heartbeats, events_per_heartbeat)
+    record_bytes, _ = measure(fill_with_records, heartbeats, events_per_heartbeat)
+    
+    print(f"{heartbeats} heartbeats with {events_per_heartbeat} events each")
+    print(f"  dicts:   {dict_bytes / 1024 / 1024:7.2f} MiB ({dict_bytes / heartbeats:6.0f} B per heartbeat)")
+    print(f"  records: {record_bytes / 1024 / 1024:7.2f} MiB ({record_bytes / heartbeats:6.0f} B per heartbeat)")
+    print(f"  saved:   {(1 - record_bytes / dict_bytes) * 100:6.1f}%")
+    
+    timings = time_comparisons(2000)
+    print(f"unchanged status comparison: dicts {timings['dicts']:.0f} ns, records {timings['records']:.0f} ns")
+    
+    sys.exit(0 if record_bytes < dict_bytes else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measure Crafty API requests/second with and without connection pooling
+
+Usage: python benchmarks/bench_http_pool.py [requests]
+"""
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from crafty_api import CraftyAPI  # noqa: E402
+from stub_crafty import StubCraftyServer  # noqa: E402
+
+
+def run_unpooled(api_url, count):
+    """One new connection per request, like module-level requests.get"""
+    headers = {"Authorization": "Bearer stub-token"}
+    for i in range(count):
+        requests.get(f"{api_url}/servers/{i % 10}/stats", headers=headers, verify=False).json()
+
+
+def run_pooled(api_url, count):
+    """Reuse the keep-alive session owned by CraftyAPI"""
+    crafty = CraftyAPI(api_url=api_url, username="bench", password="bench")
+    crafty.login()
+    for i in range(count):
+        crafty.get_server_stats(i % 10)
+    crafty.close()
+
+
+def measure(label, func, api_url, count):
+    start = time.perf_counter()
+    func(api_url, count)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: {count} requests in {elapsed:.3f}s ({count / elapsed:.0f} req/s)")
+    return count / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    stub = StubCraftyServer(server_count=10).start()
+    try:
+        unpooled = measure("unpooled", run_unpooled, stub.api_url, count)
+        pooled = measure("pooled", run_pooled, stub.api_url, count)
+        print(f"speedup: {pooled / unpooled:.2f}x")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Count Crafty API requests and wall time for poll cycles of growing size
+
+Usage: python benchmarks/bench_poll_cycle.py [latency_ms] [workers]
+
+The one-request-per-server guarantee itself is checked by tests/test_poll_cycle.py.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from crafty_api import CraftyAPI  # noqa: E402
+from main import get_server_ids, poll_servers  # noqa: E402
+from poll_scheduler import PollScheduler  # noqa: E402
+from poller import StatsPoller  # noqa: E402
+from server_state import ServerStateTracker  # noqa: E402
+from stub_crafty import StubCraftyServer  # noqa: E402
+
+
+def run_cycle(server_count, latency, workers):
+    """Run one cycle against a fresh stub and return (stats requests, seconds)"""
+    stub = StubCraftyServer(server_count=server_count, latency=latency).start()
+    try:
+        crafty = CraftyAPI(api_url=stub.api_url, username="bench", password="bench", pool_size=workers)
+        poller = StatsPoller(crafty, max_workers=workers, deadline=30)
+        crafty.login()
+        stub.reset_hits()
+        
+        start = time.perf_counter()
+        servers = crafty.get_servers() or []
+        poll_servers(poller, PollScheduler(), ServerStateTracker(), get_server_ids(servers))
+        elapsed = time.perf_counter() - start
+        
+        poller.shutdown()
+        crafty.close()
+    finally:
+        stub.stop()
+    
+    stats_hits = sum(n for path, n in stub.hits.items() if path.endswith("/stats"))
+    return stats_hits, elapsed
+
+
+def main():
+    latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.05
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    logging.disable(logging.INFO)
+    
+    print(f"stub latency {latency * 1000:.0f} ms, {workers} workers")
+    for server_count in (10, 20, 40):
+        stats_hits, elapsed = run_cycle(server_count, latency, workers)
+        print(f"{server_count:>4} servers: {stats_hits} stats requests, cycle time {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Measure how long the broadcaster takes from launch to its first LAN announcement
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--servers 20] [--latency-ms 20] [--straggler-ms 2000]
+
+Launches main.py as a fresh process against a stub Crafty Controller and a
+local UDP sink, and records the time until the first announcement packet
+arrives and until /readyz answers 200. One server's stats are held back by
+--straggler-ms, so the first packet shows whether announcements wait for the
+whole first poll cycle. Also runs a cold start with Crafty down for a few
+seconds, which must not make the process exit.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from statistics import median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from stub_crafty import StubCraftyServer  # noqa: E402
+from udp_sink import UDPSink  # noqa: E402
+
+MAIN = os.path.join(BENCH_DIR, "..", "main.py")
+
+
+def is_ready(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=0.5) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def launch(stub, sink, runtime, web, web_port, timeout=30.0, outage=0.0):
+    """Start main.py and return (seconds to first packet, seconds to ready, still running)"""
+    env = dict(os.environ,
+               CRAFTY_API_URL=stub.api_url, CRAFTY_USERNAME="bench", CRAFTY_PASSWORD="bench",
+               BROADCAST_IP="127.0.0.1", MINECRAFT_BROADCAST_PORT=str(sink.port),
+               RUNTIME_MODE=runtime, ENABLE_WEB_SERVER="true" if web else "false",
+               WEB_SERVER_PORT=str(web_port), HEARTBEAT_LOG_DIR="", CRAFTY_MAX_RETRIES="0")
+    sink.reset()
+    stub.available = outage <= 0
+    
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first_packet = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            elapsed = time.perf_counter() - started
+            if not stub.available and elapsed >= outage:
+                stub.available = True
+            if first_packet is None and sink.packets:
+                first_packet = elapsed
+            if web and ready is None and is_ready(web_port):
+                ready = time.perf_counter() - started
+            if first_packet is not None and (ready is not None or not web):
+                break
+            time.sleep(0.005)
+        running = process.poll() is None
+    finally:
+        process.terminate()
+        process.wait()
+    return first_packet, ready, running
+
+
+def summarize(label, results):
+    packets = [first for first, _, _ in results if first is not None]
+    readies = [ready for _, ready, _ in results if ready is not None]
+    line = f"{label:<28}"
+    line += f" first packet {median(packets) * 1000:7.0f} ms" if packets else " first packet     never"
+    if readies:
+        line += f", ready {median(readies) * 1000:7.0f} ms"
+    print(line)
+    return {
+        "first_packet_ms": round(median(packets) * 1000) if packets else None,
+        "ready_ms": round(median(readies) * 1000) if readies else None,
+        "runs": len(results),
+        "exited": sum(1 for _, _, running in results if not running),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--servers", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--straggler-ms", type=float, default=2000)
+    parser.add_argument("--outage", type=float, default=3.0, help="seconds Crafty is down in the cold start run")
+    parser.add_argument("--web-port", type=int, default=18480)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+    
+    stub = StubCraftyServer(server_count=args.servers, latency=args.latency_ms / 1000).start()
+    stats_for = stub.stats_for
+    
+    def stats_with_straggler(server_id):
+        if server_id == "0":
+            time.sleep(args.straggler_ms / 1000)
+        return stats_for(server_id)
+    stub.stats_for = stats_with_straggler
+    # Each run ends by killing the broadcaster mid-request; don't print every broken pipe
+    stub.httpd.handle_error = lambda request, client_address: None
+    sink = UDPSink().start()
+    
+    report = {}
+    try:
+        print(f"{args.servers} servers, {args.latency_ms:.0f} ms latency, one straggler at {args.straggler_ms:.0f} ms")
+        for runtime in ("threaded", "asyncio"):
+            for web in (False, True):
+                label = f"{runtime}, web {'on' if web else 'off'}"
+                results = [launch(stub, sink, runtime, web, args.web_port) for _ in range(args.runs)]
+                report[label] = summarize(label, results)
+        
+        label = f"threaded, Crafty down {args.outage:.0f}s"
+        result = launch(stub, sink, "threaded", True, args.web_port, outage=args.outage)
+        report[label] = summarize(label, [result])
+    finally:
+        sink.stop()
+        stub.stop()
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    
+    # Exit non-zero if a run never announced or the process gave up during the outage
+    sys.exit(1 if any(r["first_packet_ms"] is None or r["exited"] for r in report.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
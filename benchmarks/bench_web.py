@@ -0,0 +1,97 @@
+"""Load-test the dashboard API and report p50/p99 latency
+
+Usage: python benchmarks/bench_web.py [backend] [clients] [requests_per_client]
+
+Starts a HeartbeatWebServer with the given backend ("waitress" or "flask")
+on a local port, fills it with heartbeats and hits /api/logs and /api/status
+from concurrent clients.
+"""
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def client(base_url, path, count, latencies):
+    session = requests.Session()
+    for _ in range(count):
+        start = time.perf_counter()
+        response = session.get(f"{base_url}{path}")
+        response.content
+        latencies.append(time.perf_counter() - start)
+    session.close()
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else "waitress"
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    
+    port = free_port()
+    os.environ["WEB_SERVER_HOST"] = "127.0.0.1"
+    os.environ["WEB_SERVER_PORT"] = str(port)
+    os.environ["WEB_SERVER_BACKEND"] = backend
+    logging.disable(logging.WARNING)
+    
+    from web_server import HeartbeatWebServer
+    
+    web_server = HeartbeatWebServer()
+    for i in range(web_server.max_logs):
+        web_server.add_heartbeat({
+            "active_servers": [{"id": str(n), "name": f"Server {n}", "port": 25565 + n, "players": "3/20"}
+                               for n in range(10)],
+            "total_servers": 20,
+            "total_active": 10
+        })
+    web_server.start()
+    base_url = f"http://127.0.0.1:{port}"
+    
+    # Wait for the server to accept connections
+    for _ in range(50):
+        try:
+            requests.get(f"{base_url}/api/status", timeout=1)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    
+    print(f"backend: {web_server.backend}, {clients} clients x {count} requests")
+    for path in ("/api/status", "/api/logs?limit=100", "/api/logs?limit=1000"):
+        latencies = []
+        threads = [threading.Thread(target=client, args=(base_url, path, count, latencies))
+                   for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        
+        print(f"{path:<22} {len(latencies) / elapsed:8.0f} req/s  "
+              f"p50 {percentile(latencies, 50) * 1000:7.2f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:7.2f} ms  "
+              f"mean {statistics.mean(latencies) * 1000:7.2f} ms")
+    
+    web_server.stop()
+
+
+if __name__ == "__main__":
+    main()
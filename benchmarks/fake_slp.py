@@ -0,0 +1,115 @@
+"""Local fake Minecraft server that answers Server List Ping status requests"""
+import json
+import socketserver
+import struct
+import threading
+import time
+
+
+def _varint(value):
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(rfile):
+    value = 0
+    for i in range(5):
+        byte = rfile.read(1)
+        if not byte:
+            raise EOFError
+        value |= (byte[0] & 0x7F) << (7 * i)
+        if not byte[0] & 0x80:
+            return value
+    raise ValueError("VarInt is too long")
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+
+class FakeSLPServer:
+    """Answer status pings with a fixed MOTD, player counts and version
+    
+    `delay` holds the response back for that many seconds, `silent` accepts
+    connections but never answers and `chunked` sends the response a few
+    bytes at a time, to exercise the prober's timeouts and partial reads.
+    """
+    
+    def __init__(self, motd="A Minecraft Server", online=0, max_players=20, version="1.20.4",
+                 delay=0.0, silent=False, chunked=False, host="127.0.0.1", port=0):
+        self.status = {
+            "version": {"name": version, "protocol": 765},
+            "players": {"max": max_players, "online": online, "sample": []},
+            "description": {"text": "", "extra": [{"text": motd, "color": "green"}]},
+        }
+        self.delay = delay
+        self.silent = silent
+        self.chunked = chunked
+        self.handshakes = []  # (protocol version, host, port) of every handshake seen
+        self.server = _TCPServer((host, port), self._make_handler())
+        self.thread = None
+    
+    @property
+    def port(self):
+        return self.server.server_address[1]
+    
+    def _make_handler(self):
+        fake = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    # Handshake: length, id 0, protocol version, host, port, next state
+                    _read_varint(self.rfile)
+                    _read_varint(self.rfile)
+                    protocol = _read_varint(self.rfile)
+                    host = self.rfile.read(_read_varint(self.rfile)).decode("utf-8")
+                    port = struct.unpack(">H", self.rfile.read(2))[0]
+                    _read_varint(self.rfile)
+                    fake.handshakes.append((protocol, host, port))
+                    
+                    # Status request: length 1, id 0
+                    _read_varint(self.rfile)
+                    _read_varint(self.rfile)
+                except (EOFError, ValueError, ConnectionError):
+                    return
+                
+                if fake.silent:
+                    time.sleep(5)
+                    return
+                if fake.delay:
+                    time.sleep(fake.delay)
+                
+                body = json.dumps(fake.status).encode("utf-8")
+                payload = _varint(0x00) + _varint(len(body)) + body
+                packet = _varint(len(payload)) + payload
+                if fake.chunked:
+                    for i in range(0, len(packet), 7):
+                        self.wfile.write(packet[i:i + 7])
+                        self.wfile.flush()
+                        time.sleep(0.001)
+                else:
+                    self.wfile.write(packet)
+        
+        return Handler
+    
+    def start(self):
+        # A short poll interval keeps stop() quick when many fakes are stopped in a row
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05},
+                                       daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,63 @@
+"""Switch the stub Crafty off and on and watch the circuit breaker and degraded mode
+
+Usage: python benchmarks/outage_drill.py
+
+Prints, every half second, the breaker state, how many requests reached the
+stub and how many servers are still being announced. Announcements should
+survive the outage for DEGRADED_GRACE_PERIOD seconds and then stop, while
+requests to the dead controller drop to one probe per CIRCUIT_RESET_TIMEOUT.
+"""
+import logging
+import os
+import sys
+import time
+
+# Short timings so the drill finishes quickly
+os.environ.setdefault("CIRCUIT_FAILURE_THRESHOLD", "3")
+os.environ.setdefault("CIRCUIT_RESET_TIMEOUT", "1")
+os.environ.setdefault("DEGRADED_GRACE_PERIOD", "3")
+os.environ.setdefault("CRAFTY_MAX_RETRIES", "1")
+os.environ.setdefault("CRAFTY_BACKOFF_BASE", "0.05")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from crafty_api import CraftyAPI  # noqa: E402
+from main import get_server_ids  # noqa: E402
+from poller import StatsPoller  # noqa: E402
+from server_state import ServerStateTracker  # noqa: E402
+from stub_crafty import StubCraftyServer  # noqa: E402
+
+TIMELINE = ((0, True), (2, False), (7, True))  # (seconds, stub available)
+DURATION = 10
+TICK = 0.5
+
+
+def main():
+    logging.disable(logging.WARNING)
+    stub = StubCraftyServer(server_count=10).start()
+    crafty = CraftyAPI(api_url=stub.api_url, username="drill", password="drill")
+    poller = StatsPoller(crafty, max_workers=10, deadline=5)
+    tracker = ServerStateTracker()
+    
+    start = time.monotonic()
+    print(f"{'t':>5}  {'stub':<4}  {'circuit':<9}  {'requests':>8}  {'announced':>9}")
+    try:
+        while (elapsed := time.monotonic() - start) < DURATION:
+            stub.available = [available for at, available in TIMELINE if elapsed >= at][-1]
+            stub.reset_hits()
+            
+            server_ids = get_server_ids(crafty.get_servers() or [])
+            tracker.retain(server_ids)
+            tracker.update(poller.poll(server_ids))
+            
+            print(f"{elapsed:5.1f}  {'up' if stub.available else 'down':<4}  {crafty.breaker.state:<9}  "
+                  f"{sum(stub.hits.values()):>8}  {len(tracker.announcements()):>9}")
+            time.sleep(max(0.0, TICK - (time.monotonic() - start - elapsed)))
+    finally:
+        poller.shutdown()
+        crafty.close()
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Load scenarios for the broadcaster against a fake Crafty Controller
+
+For each server count, a fake controller runs in its own process. This
+process then polls every server for a number of full cycles and announces
+the running ones to a local UDP sink. The report covers cycle time, Crafty
+requests per cycle, announcement packets/second, CPU time and RSS of the
+broadcaster, and is written as JSON so runs can be compared.
+
+Usage: python benchmarks/run_scenarios.py [--servers 10,100,1000] [--output results.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from statistics import mean, median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from broadcast_scheduler import BroadcastScheduler  # noqa: E402
+from crafty_api import CraftyAPI  # noqa: E402
+from main import get_server_ids, poll_servers  # noqa: E402
+from minecraft_broadcaster import MinecraftBroadcaster  # noqa: E402
+from poll_scheduler import PollScheduler  # noqa: E402
+from poller import StatsPoller  # noqa: E402
+from server_state import ServerStateTracker  # noqa: E402
+from udp_sink import UDPSink  # noqa: E402
+
+
+def rss_mb():
+    """Current resident set size of this process in MiB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS is the best we can do without /proc
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cpu_seconds():
+    """User plus system CPU time used by this process so far"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class FakeCrafty:
+    """Run stub_crafty.py in a child process so its CPU isn't billed to the broadcaster"""
+    
+    def __init__(self, servers, latency_ms, error_rate, token_ttl):
+        command = [sys.executable, os.path.join(BENCH_DIR, "stub_crafty.py"),
+                   "--servers", str(servers), "--latency-ms", str(latency_ms),
+                   "--error-rate", str(error_rate)]
+        if token_ttl:
+            command += ["--token-ttl", str(token_ttl)]
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        self.api_url = self.process.stdout.readline().strip()
+        self.base_url = self.api_url.rsplit("/api/v2", 1)[0]
+    
+    def hits(self):
+        """Request counts per path since the last reset"""
+        with urllib.request.urlopen(f"{self.base_url}/_stub/hits") as response:
+            return json.load(response)
+    
+    def reset(self):
+        """Clear the request counts"""
+        urllib.request.urlopen(urllib.request.Request(f"{self.base_url}/_stub/reset", data=b"")).close()
+    
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def run_scenario(servers, args):
+    """Run one scenario and return its result dict"""
+    fake = FakeCrafty(servers, args.latency_ms, args.error_rate, args.token_ttl)
+    sink = UDPSink().start()
+    crafty = CraftyAPI(api_url=fake.api_url, username="bench", password="bench", pool_size=args.workers)
+    poller = StatsPoller(crafty, max_workers=args.workers, deadline=args.deadline)
+    tracker = ServerStateTracker()
+    broadcaster = MinecraftBroadcaster(broadcast_ip="127.0.0.1", broadcast_port=sink.port, interfaces="")
+    scheduler = BroadcastScheduler(broadcaster, interval=args.broadcast_interval)
+    
+    try:
+        cpu_started = cpu_seconds()
+        wall_started = time.perf_counter()
+        
+        crafty.login()
+        server_ids = get_server_ids(crafty.get_servers() or [])
+        
+        # Full cycles: every server is polled every cycle (the adaptive scheduler's worst case)
+        cycle_times = []
+        requests = []
+        for _ in range(args.cycles):
+            fake.reset()
+            started = time.perf_counter()
+            poll_servers(poller, PollScheduler(), tracker, server_ids)
+            cycle_times.append((time.perf_counter() - started) * 1000)
+            requests.append(sum(fake.hits().values()))
+        
+        # Announce the running servers at the configured rate, counting whole
+        # intervals only: stop halfway between the last tick and the next
+        ticks = max(1, round(args.broadcast_seconds / args.broadcast_interval))
+        broadcast_seconds = ticks * args.broadcast_interval
+        sink.reset()
+        scheduler.update_servers(tracker.announcements())
+        scheduler.start()
+        time.sleep(broadcast_seconds - args.broadcast_interval / 2)
+        scheduler.stop()
+        packets = sink.packets
+        
+        cpu_used = cpu_seconds() - cpu_started
+        wall = time.perf_counter() - wall_started
+    finally:
+        poller.shutdown()
+        crafty.close()
+        broadcaster.close()
+        sink.stop()
+        fake.stop()
+    
+    return {
+        "servers": servers,
+        "active_servers": tracker.active_count,
+        "cycles": args.cycles,
+        "cycle_time_ms": {
+            "min": round(min(cycle_times), 2),
+            "median": round(median(cycle_times), 2),
+            "mean": round(mean(cycle_times), 2),
+            "max": round(max(cycle_times), 2),
+        },
+        "requests_per_cycle": round(mean(requests), 1),
+        "packets_per_second": round(packets / broadcast_seconds, 1),
+        "cpu_seconds": round(cpu_used, 3),
+        "cpu_percent": round(100 * cpu_used / wall, 1),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", default="10,100,1000", help="comma-separated server counts")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake controller stats latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stats requests failing with 500")
+    parser.add_argument("--token-ttl", type=float, default=None, help="seconds until fake tokens expire")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=60.0)
+    parser.add_argument("--broadcast-interval", type=float, default=1.5)
+    parser.add_argument("--broadcast-seconds", type=float, default=3.0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    
+    report = {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": [],
+    }
+    for servers in (int(count) for count in args.servers.split(",")):
+        result = run_scenario(servers, args)
+        report["scenarios"].append(result)
+        print(f"{servers:>5} servers: cycle {result['cycle_time_ms']['median']:.1f} ms, "
+              f"{result['requests_per_cycle']:.0f} requests/cycle, "
+              f"{result['packets_per_second']:.0f} packets/s, "
+              f"cpu {result['cpu_percent']:.0f}%, rss {result['rss_mb']:.1f} MiB", file=sys.stderr)
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Minimal local stand-in for the Crafty Controller API used by the benchmarks
+
+Can also be run on its own, e.g. to point main.py at a fake controller:
+    
+    python benchmarks/stub_crafty.py --servers 100 --latency-ms 20 --port 8443
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATS_PATH = re.compile(r"^/api/v2/servers/([^/]+)/stats$")
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # avoid SYN retransmit stalls under concurrent load
+
+
+class StubCraftyServer:
+    """Serve /auth/login, /servers and /servers/{id}/stats on localhost"""
+    
+    def __init__(self, server_count=10, latency=0.0, host="127.0.0.1", port=0, error_rate=0.0, token_ttl=None):
+        """Create the stub with `server_count` servers, half of them running
+        
+        `latency` is the delay in seconds added to every stats response.
+        `error_rate` is the fraction of stats requests answered with a 500.
+        With `token_ttl`, issued tokens expire after that many seconds and
+        requests carrying an expired or unknown token get a 401.
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.tokens = {}  # token -> expiry time
+        self.available = True  # Set to False to make every request fail like a dead controller
+        self.servers = [
+            {"server_id": str(i), "server_name": f"Server {i}"}
+            for i in range(server_count)
+        ]
+        self.hits = Counter()
+        self.lock = threading.Lock()
+        self.httpd = _HTTPServer((host, port), self._make_handler())
+        self.thread = None
+    
+    @property
+    def api_url(self):
+        """Base URL to hand to CraftyAPI"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+    
+    def count(self, path):
+        """Record one request for `path`"""
+        with self.lock:
+            self.hits[path] += 1
+    
+    def reset_hits(self):
+        """Clear the request counters"""
+        with self.lock:
+            self.hits.clear()
+    
+    def issue_token(self):
+        """Create a new API token"""
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens[token] = time.monotonic() + self.token_ttl if self.token_ttl else None
+        return token
+    
+    def token_valid(self, header):
+        """Check an Authorization header; any token is accepted unless token_ttl is set"""
+        if not self.token_ttl:
+            return True
+        token = (header or "").replace("Bearer ", "", 1)
+        with self.lock:
+            expiry = self.tokens.get(token)
+        return expiry is not None and time.monotonic() < expiry
+    
+    def stats_for(self, server_id):
+        """Build the stats payload for one server"""
+        index = int(server_id)
+        return {
+            "server_id": {"server_id": server_id, "server_name": f"Server {server_id}"},
+            "running": index % 2 == 0,
+            "server_port": 25565 + index,
+            "desc": "A Minecraft Server",
+            "version": "1.20.4",
+            "max": 20,
+            "online": index % 5,
+        }
+    
+    def _make_handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            disable_nagle_algorithm = True
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _refuse(self):
+                """Drop the connection without answering while the stub is switched off"""
+                stub.count(self.path)
+                self.close_connection = True
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                if not stub.available:
+                    return self._refuse()
+                if self.path == "/_stub/reset":
+                    stub.reset_hits()
+                    self._send(200, {"status": "ok"})
+                    return
+                stub.count(self.path)
+                if self.path == "/api/v2/auth/login":
+                    self._send(200, {"status": "ok", "data": {"token": stub.issue_token()}})
+                else:
+                    self._send(404, {"status": "error"})
+            
+            def do_GET(self):
+                if not stub.available:
+                    return self._refuse()
+                if self.path == "/_stub/hits":
+                    with stub.lock:
+                        self._send(200, dict(stub.hits))
+                    return
+                stub.count(self.path)
+                if not stub.token_valid(self.headers.get("Authorization")):
+                    self._send(401, {"status": "error", "error": "ACCESS_DENIED"})
+                    return
+                if self.path == "/api/v2/servers":
+                    self._send(200, {"status": "ok", "data": stub.servers})
+                    return
+                match = STATS_PATH.match(self.path)
+                if match and int(match.group(1)) < len(stub.servers):
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    if stub.error_rate and random.random() < stub.error_rate:
+                        self._send(500, {"status": "error"})
+                        return
+                    self._send(200, {"status": "ok", "data": stub.stats_for(match.group(1))})
+                else:
+                    self._send(404, {"status": "error"})
+        
+        return Handler
+    
+    def start(self):
+        """Serve requests in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        """Shut the stub down"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Crafty Controller")
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+    
+    stub = StubCraftyServer(args.servers, args.latency_ms / 1000, args.host, args.port,
+                            error_rate=args.error_rate, token_ttl=args.token_ttl)
+    # The first line tells a parent process where to connect
+    print(stub.api_url, flush=True)
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""UDP receiver that counts the LAN announcements sent by MinecraftBroadcaster"""
+import socket
+import threading
+from collections import Counter
+
+
+class UDPSink:
+    """Receive datagrams on localhost and count them per announced port"""
+    
+    def __init__(self, host="127.0.0.1", port=0):
+        """Bind the sink; port 0 picks a free port"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.packets = 0
+        self.bytes = 0
+        self.ports = Counter()  # Announced game port -> packets
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+    
+    @property
+    def port(self):
+        """Port to hand to MinecraftBroadcaster"""
+        return self.sock.getsockname()[1]
+    
+    def reset(self):
+        """Clear the counters"""
+        with self.lock:
+            self.packets = 0
+            self.bytes = 0
+            self.ports.clear()
+    
+    def _receive(self):
+        while self.running:
+            try:
+                data = self.sock.recv(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            # Payload is "[MOTD]...[/MOTD][AD]<port>[/AD]" after a 4-byte header
+            port = data.rsplit(b"[AD]", 1)[-1][:-5]
+            with self.lock:
+                self.packets += 1
+                self.bytes += len(data)
+                self.ports[port] += 1
+    
+    def start(self):
+        """Receive in a background thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._receive, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        """Stop receiving and close the socket"""
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        self.sock.close()
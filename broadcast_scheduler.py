@@ -0,0 +1,100 @@
+import os
+import time
+import logging
+import threading
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.scheduler')
+
+class BroadcastScheduler:
+    """Class to re-announce the active servers on the LAN at a fixed rate"""
+    
+    def __init__(self, broadcaster, interval=None):
+        """Initialize the scheduler for the given broadcaster"""
+        self.broadcaster = broadcaster
+        self.interval = float(interval or os.environ.get("BROADCAST_INTERVAL", "1.5"))
+        self.servers = []  # (name, motd, port) tuples announced every interval
+        self.added = []  # Servers added since the last tick, announced once right away
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.running = False
+        
+        logger.info(f"Initialized broadcast scheduler with a {self.interval}s interval")
+    
+    def update_servers(self, servers):
+        """Replace the set of announced servers
+        
+        `servers` is an iterable of (name, motd, port) tuples. Newly added servers
+        are announced once right away instead of waiting for the next tick; the
+        others stay on the regular schedule, so frequent updates don't
+        re-announce the whole set.
+        """
+        servers = list(servers)
+        with self.lock:
+            previous = set(self.servers)
+            added = [server for server in servers if server not in previous]
+            self.servers = servers
+            self.added.extend(added)
+        
+        if added:
+            self.wake.set()
+    
+    def _take_added(self, tick=False):
+        """Take the servers added since they were last announced that are still announced
+        
+        With `tick`, a full tick is about to announce everything, so they are just dropped.
+        """
+        with self.lock:
+            added, self.added = self.added, []
+            if tick or not added:
+                return []
+            current = set(self.servers)
+            return [server for server in dict.fromkeys(added) if server in current]
+    
+    def get_servers(self):
+        """Get the currently announced servers"""
+        with self.lock:
+            return list(self.servers)
+    
+    def start(self):
+        """Start announcing in a separate thread"""
+        if self.thread and self.thread.is_alive():
+            logger.warning("Broadcast scheduler is already running")
+            return
+        
+        self.running = True
+        # Updates before the start are announced by the first tick anyway
+        self.wake.clear()
+        self._take_added(tick=True)
+        self.thread = threading.Thread(target=self._run, name="broadcast-scheduler")
+        self.thread.daemon = True  # Make thread a daemon so it exits when main program exits
+        self.thread.start()
+        
+        logger.info("Broadcast scheduler started")
+    
+    def is_alive(self):
+        """Check whether the announcing thread is running"""
+        return self.running and self.thread is not None and self.thread.is_alive()
+    
+    def stop(self):
+        """Stop announcing and wait for the thread to finish"""
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join()
+    
+    def _run(self):
+        """Announce every server each tick, and added servers as soon as they come in"""
+        while self.running:
+            next_tick = time.monotonic() + self.interval
+            
+            self._take_added(tick=True)
+            self.broadcaster.broadcast_many(self.get_servers())
+            
+            while self.running and time.monotonic() < next_tick:
+                self.wake.wait(next_tick - time.monotonic())
+                self.wake.clear()
+                added = self._take_added()
+                if added:
+                    self.broadcaster.broadcast_many(added)
\ No newline at end of file
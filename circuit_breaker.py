@@ -0,0 +1,74 @@
+import os
+import time
+import logging
+import threading
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.circuit_breaker')
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Class to stop calling a dependency that keeps failing
+    
+    After `failure_threshold` consecutive failures the circuit opens and every
+    call is refused without touching the network. Once `reset_timeout` seconds
+    have passed a single probe is let through (half-open); its success closes
+    the circuit, its failure opens it again for another timeout.
+    """
+    
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        """Initialize a closed circuit"""
+        self.name = name
+        self.failure_threshold = int(failure_threshold or os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.reset_timeout = float(reset_timeout or os.environ.get("CIRCUIT_RESET_TIMEOUT", "30"))
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.probe_started = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def is_open(self):
+        """Check whether calls are currently being refused"""
+        return self.state != CLOSED
+    
+    def allow_request(self):
+        """Check whether a call may go ahead, claiming the probe slot when half-open"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                logger.info(f"Circuit {self.name} is half-open, sending a probe")
+                self.state = HALF_OPEN
+                self.probe_started = now
+                return True
+            
+            if self.state == HALF_OPEN and now - self.probe_started >= self.reset_timeout:
+                # The previous probe never reported back
+                self.probe_started = now
+                return True
+            
+            return False
+    
+    def record_success(self):
+        """Record a successful call, closing the circuit"""
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit {self.name} closed, {self.name} is reachable again")
+            self.state = CLOSED
+            self.failures = 0
+    
+    def record_failure(self):
+        """Record a failed call, opening the circuit if needed"""
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit {self.name} opened after {self.failures} failure(s), "
+                               f"probing again in {self.reset_timeout}s")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
\ No newline at end of file
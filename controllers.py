@@ -0,0 +1,196 @@
+import os
+import re
+import time
+import socket
+import logging
+import ipaddress
+import threading
+from urllib.parse import urlparse
+from crafty_api import CraftyAPI
+from minecraft_broadcaster import MinecraftBroadcaster
+from poller import StatsPoller
+from poll_scheduler import PollScheduler
+from server_state import ServerStateTracker
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.controllers')
+
+class Controller:
+    """Class to hold everything polled from one Crafty Controller
+    
+    Each controller has its own API client (and so its own token and
+    connection pool), poller, poll schedule and server state, so a slow or
+    unreachable controller never holds up the others.
+    """
+    
+    def __init__(self, name, crafty, poller, poll_scheduler, tracker, source=None, announce=True):
+        """Bundle the per-controller components
+        
+        `source` prefixes the controller's server IDs in shared stores such as
+        the time series; it is None when there is only one controller. With
+        `announce` False the servers are polled for the dashboard and metrics
+        but never announced on the LAN.
+        """
+        self.name = name
+        self.source = source
+        self.announce = announce
+        self.crafty = crafty
+        self.poller = poller
+        self.poll_scheduler = poll_scheduler
+        self.tracker = tracker
+        self.servers = []
+        self.next_inventory = 0
+        self.last_inventory = 0  # When the server list was last fetched successfully
+        # Replaced (never mutated) by the controller's own loop so other threads can read it
+        self.announcements = []
+        self.ready = False  # Set once every listed server has been polled
+        self.last_tick = time.monotonic()  # Last pass through the controller's loop
+        # Delay before retrying a failed server list fetch, doubled up to the check interval
+        self.retry_delay = float(os.environ.get("BOOTSTRAP_RETRY_DELAY", "1"))
+    
+    def inventory_expired(self, now=None):
+        """Check whether the last good server list is older than DEGRADED_GRACE_PERIOD
+        
+        Past that point the controller's servers are no longer announced, like
+        servers whose stats can't be fetched.
+        """
+        now = time.monotonic() if now is None else now
+        return bool(self.servers) and now - self.last_inventory > self.poller.grace_period
+    
+    def forget_servers(self):
+        """Drop every server of this controller; returns "down" events for those that were running"""
+        self.servers = []
+        self.poll_scheduler.sync([])
+        return self.tracker.retain([])
+
+def load_controller_configs():
+    """Read the list of Crafty Controllers to poll from the environment
+    
+    CRAFTY_CONTROLLERS is a comma-separated list of name=url pairs, e.g.
+    "alpha=https://host1:8443/api/v2,beta=https://host2:8443/api/v2".
+    Credentials come from CRAFTY_<NAME>_USERNAME and CRAFTY_<NAME>_PASSWORD,
+    falling back to CRAFTY_USERNAME and CRAFTY_PASSWORD. Without
+    CRAFTY_CONTROLLERS a single controller named "default" is configured from
+    CRAFTY_API_URL as before.
+    
+    Returns a list of {"name", "api_url", "username", "password"} dicts.
+    """
+    spec = os.environ.get("CRAFTY_CONTROLLERS", "").strip()
+    if not spec:
+        return [{"name": "default", "api_url": None, "username": None, "password": None}]
+    
+    configs = []
+    for item in (item.strip() for item in spec.split(",")):
+        if not item:
+            continue
+        name, separator, api_url = item.partition("=")
+        if not separator:
+            # A bare URL is named after its position
+            name, api_url = f"crafty{len(configs) + 1}", item
+        name = name.strip()
+        if any(config["name"] == name for config in configs):
+            logger.warning(f"Controller {name} is configured more than once, ignoring {api_url}")
+            continue
+        
+        env_name = re.sub(r"\W", "_", name).upper()
+        configs.append({
+            "name": name,
+            "api_url": api_url.strip(),
+            "username": os.environ.get(f"CRAFTY_{env_name}_USERNAME") or os.environ.get("CRAFTY_USERNAME", ""),
+            "password": os.environ.get(f"CRAFTY_{env_name}_PASSWORD") or os.environ.get("CRAFTY_PASSWORD", "")
+        })
+    return configs
+
+def is_local_host(hostname):
+    """Check whether a host name resolves to this machine; None if it can't be resolved"""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(hostname, None)}
+        local = {info[4][0] for info in socket.getaddrinfo(socket.gethostname(), None)}
+    except (socket.gaierror, UnicodeError):
+        return None
+    return any(ipaddress.ip_address(address.split("%")[0]).is_loopback or address in local
+               for address in addresses)
+
+def create_controllers(crafty_class=CraftyAPI, poller_class=StatsPoller):
+    """Create a Controller for every configured Crafty Controller"""
+    configs = load_controller_configs()
+    controllers = []
+    for config in configs:
+        crafty = crafty_class(config["api_url"], config["username"], config["password"], name=config["name"])
+        
+        # LAN clients join the announcing address, i.e. this host, on the announced port,
+        # so servers of a controller on another host can't be announced from here
+        hostname = urlparse(crafty.api_url).hostname or "localhost"
+        announce = is_local_host(hostname) is not False
+        if not announce:
+            logger.error(f"Controller {config['name']} runs on {hostname}, not on this host: its servers would be "
+                         f"announced at this host's address, so they are only polled for the dashboard and "
+                         f"metrics. Run a broadcaster on {hostname} to announce them.")
+        controllers.append(Controller(
+            config["name"],
+            crafty,
+            poller_class(crafty),
+            PollScheduler(),
+            ServerStateTracker(),
+            source=config["name"] if len(configs) > 1 else None,
+            announce=announce
+        ))
+    
+    logger.info(f"Polling {len(controllers)} controller(s): {', '.join(c.name for c in controllers)}")
+    return controllers
+
+class AnnouncementMerger:
+    """Class to merge the active servers of all controllers into one announced set
+    
+    Servers are deduplicated by game port, since that is what a LAN
+    announcement advertises; when two controllers report the same port, the
+    controller listed first in the configuration wins.
+    
+    An announcement carries no host: clients connect to the packet's source
+    address, i.e. the broadcaster's host. Controllers on other hosts are
+    therefore left out (see Controller.announce); only servers of controllers
+    on this host are merged.
+    """
+    
+    def __init__(self, controllers, scheduler):
+        """Initialize the merger for the given controllers and broadcast scheduler"""
+        self.controllers = controllers
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self.conflicts = set()  # Ports already warned about
+    
+    def update(self, controller):
+        """Take a controller's current announcements and push the merged set to the scheduler"""
+        controller.announcements = controller.tracker.announcements()
+        return self._push()
+    
+    def announce_early(self, controller, info):
+        """Announce a server as soon as it is found running, before its controller's first cycle completes
+        
+        The next update() replaces these with the tracker's announcements.
+        """
+        motd = MinecraftBroadcaster.generate_motd(info.name, info.description)
+        controller.announcements = controller.announcements + [(info.name, motd, info.port)]
+        return self._push()
+    
+    def _push(self):
+        """Merge every controller's announcements and hand them to the scheduler"""
+        with self.lock:
+            merged = {}
+            owners = {}
+            for source in self.controllers:
+                if not source.announce:
+                    continue
+                for name, motd, port in source.announcements:
+                    if port in merged:
+                        if port not in self.conflicts:
+                            logger.warning(f"Port {port} is announced by both {owners[port]} and {source.name}, "
+                                           f"keeping {merged[port][0]} from {owners[port]}")
+                            self.conflicts.add(port)
+                        continue
+                    merged[port] = (name, motd, port)
+                    owners[port] = source.name
+            
+            self.conflicts &= set(merged)
+            self.scheduler.update_servers(merged.values())
+        return len(merged)
\ No newline at end of file
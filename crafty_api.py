@@ -1,9 +1,16 @@
 import os
 import logging
+import random
 import requests
+import threading
 import time
+from requests.adapters import HTTPAdapter
 from urllib3.exceptions import InsecureRequestWarning
 from requests.exceptions import RequestException
+from circuit_breaker import CircuitBreaker
+from server_status import ServerStatus
+from metrics import (CRAFTY_REQUEST_SECONDS, CRAFTY_LOGINS, CRAFTY_LOGIN_SECONDS, CRAFTY_INVENTORY_CACHE,
+                     CRAFTY_CIRCUIT_OPEN)
 
 # Disable SSL warnings for local development
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -14,14 +21,55 @@ logger = logging.getLogger('minecraft_broadcaster.crafty_api')
 class CraftyAPI:
     """Class to interact with Crafty Controller API"""
     
-    def __init__(self, api_url=None, username=None, password=None):
-        """Initialize the Crafty API client"""
+    def __init__(self, api_url=None, username=None, password=None,
+                 pool_size=None, connect_timeout=None, read_timeout=None, name="default"):
+        """Initialize the Crafty API client; `name` tags its metrics and logs"""
+        self.name = name
         self.api_url = api_url or os.environ.get("CRAFTY_API_URL", "https://localhost:8443/api/v2")
         self.username = username or os.environ.get("CRAFTY_USERNAME", "")
         self.password = password or os.environ.get("CRAFTY_PASSWORD", "")
         self.token = ""  # Token will always be fetched via login
         self.token_expiry = 0
-        self.token_ttl = 3600  # Default token expiry time (1 hour)
+        self.token_ttl = int(os.environ.get("CRAFTY_TOKEN_TTL", "3600"))  # Token expiry time (1 hour)
+        # Renew this long before expiry, but never earlier than halfway through the token's life
+        self.token_refresh_margin = min(int(os.environ.get("CRAFTY_TOKEN_REFRESH_MARGIN", "60")), self.token_ttl / 2)
+        self.token_refresh_min_wait = 1.0  # Shortest pause between two renewals
+        
+        # Single-flight login: concurrent callers wait for one in-flight login
+        self.login_lock = threading.Lock()
+        self.token_generation = 0
+        self.login_failures = 0
+        self.login_retry_at = 0
+        self.refresh_thread = None
+        self.refresh_wake = threading.Event()
+        self.closed = False
+        
+        # Retry policy for failed requests and logins
+        self.max_retries = int(os.environ.get("CRAFTY_MAX_RETRIES", "2"))
+        self.backoff_base = float(os.environ.get("CRAFTY_BACKOFF_BASE", "0.5"))
+        self.backoff_max = float(os.environ.get("CRAFTY_BACKOFF_MAX", "60"))
+        
+        # Stop calling Crafty while it is unreachable
+        self.breaker = CircuitBreaker(f"crafty:{name}")
+        CRAFTY_CIRCUIT_OPEN.labels(name).set_function(lambda: int(self.breaker.is_open))
+        
+        # Connection pool and timeout settings
+        self.pool_size = int(pool_size or os.environ.get("CRAFTY_POOL_SIZE", "10"))
+        self.connect_timeout = float(connect_timeout or os.environ.get("CRAFTY_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(read_timeout or os.environ.get("CRAFTY_READ_TIMEOUT", "10"))
+        self.timeout = (self.connect_timeout, self.read_timeout)
+        self.session = self._create_session()
+        
+        # Server inventory cache
+        self.inventory_ttl = float(os.environ.get("INVENTORY_TTL", "300"))
+        self.inventory = None
+        self.inventory_ids = set()
+        self.inventory_expiry = 0
+        self.inventory_lock = threading.Lock()
+        self.inventory_hits = CRAFTY_INVENTORY_CACHE.labels(name, "hit")
+        self.inventory_misses = CRAFTY_INVENTORY_CACHE.labels(name, "miss")
+        self.logins = CRAFTY_LOGINS.labels(name)
+        self.login_seconds = CRAFTY_LOGIN_SECONDS.labels(name)
         
         if not self.username or not self.password:
             if not self.token:
@@ -29,14 +77,90 @@ class CraftyAPI:
             else:
                 logger.info("Using provided API token for authentication")
         
-        logger.info(f"Initialized Crafty API client for: {self.api_url}")
+        logger.info(f"Initialized Crafty API client '{name}' for: {self.api_url}")
+    
+    def _create_session(self):
+        """Create a pooled keep-alive HTTP session for the Crafty API
+        
+        Connections (and their TLS sessions) stay open between calls, so each
+        poll reuses an established connection instead of doing a new handshake.
+        """
+        session = requests.Session()
+        session.verify = False
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            pool_block=False
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def close(self):
+        """Stop the token refresher and close all pooled connections"""
+        self.closed = True
+        self.refresh_wake.set()
+        self.session.close()
+    
+    def _token_valid(self):
+        """Check whether the current token can still be used"""
+        return bool(self.token) and time.time() < self.token_expiry
+    
+    def _backoff(self, attempt):
+        """Exponential backoff delay with jitter for the given attempt (1-based)"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
     
-    def login(self):
-        """Authenticate with Crafty Controller to get an API token"""
-        if self.token and time.time() < self.token_expiry:
+    def login(self, force=False):
+        """Authenticate with Crafty Controller to get an API token
+        
+        Concurrent callers share a single in-flight login. After a failed login
+        further attempts are refused until an exponential backoff has passed,
+        so an outage doesn't turn into a login storm. With `force`, a new token
+        is requested even if the current one is still valid.
+        """
+        if not force and self._token_valid():
             logger.debug("Using existing token")
             return True
-            
+        
+        generation = self.token_generation
+        with self.login_lock:
+            skipped = self._login_skipped(force, generation)
+            if skipped is not None:
+                return skipped
+            return self._login_finished(self._login())
+    
+    def _login_skipped(self, force, generation):
+        """Check, holding the login lock, whether a login is still needed
+        
+        Returns True if another caller logged in while we were waiting for the
+        lock, False while logins back off after a failure, and None if the
+        caller should log in now.
+        """
+        if self._token_valid() and (not force or self.token_generation != generation):
+            return True
+        
+        if time.monotonic() < self.login_retry_at:
+            logger.debug("Login is backing off after a failure")
+            return False
+        return None
+    
+    def _login_finished(self, succeeded):
+        """Record the outcome of a login: start refreshing the new token or back off"""
+        if succeeded:
+            self.login_failures = 0
+            self.token_generation += 1
+            self._schedule_refresh()
+            return True
+        
+        self.login_failures += 1
+        delay = self._backoff(self.login_failures)
+        self.login_retry_at = time.monotonic() + delay
+        logger.warning(f"Login failed {self.login_failures} time(s), next attempt in {delay:.1f}s")
+        return False
+    
+    def _login(self):
+        """Request a new API token from Crafty Controller"""
         try:
             logger.info("Authenticating with Crafty Controller")
             url = f"{self.api_url}/auth/login"
@@ -48,83 +172,237 @@ class CraftyAPI:
             }
             
             # Make login request
-            response = requests.post(
-                url, 
-                json=login_data, 
-                verify=False
-            )
+            self.logins.inc()
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    url, 
+                    json=login_data, 
+                    timeout=self.timeout
+                )
+            finally:
+                self.login_seconds.observe(time.perf_counter() - started)
+            self._record_outcome(response.status_code)
             response.raise_for_status()
             
-            # Parse response
-            data = response.json()
-            if data.get("status") == "ok" and "data" in data:
-                self.token = data["data"].get("token", "")
-                if self.token:
-                    self.token_expiry = time.time() + self.token_ttl
-                    logger.info("Successfully authenticated with Crafty Controller")
-                    return True
-                else:
-                    logger.error("Authentication successful but no token received")
-                    return False
-            else:
-                logger.error(f"Unexpected API response format during login: {data}")
-                return False
+            return self._accept_login(response.json())
                 
         except RequestException as e:
-            logger.error(f"Error authenticating with Crafty Controller: {e}")
+            return self._login_error(e, getattr(e, 'response', None) is not None)
+    
+    def _accept_login(self, data):
+        """Take the token from a login response; returns whether there was one"""
+        if data.get("status") != "ok" or "data" not in data:
+            logger.error(f"Unexpected API response format during login: {data}")
+            return False
+        
+        token = data["data"].get("token", "")
+        if not token:
+            logger.error("Authentication successful but no token received")
             return False
+        
+        self.token_expiry = time.time() + self.token_ttl
+        self.token = token
+        logger.info("Successfully authenticated with Crafty Controller")
+        return True
     
-    def _make_request(self, endpoint, method="GET", data=None):
-        """Make a request to the Crafty API"""
-        # Try to login if we don't have a valid token
-        if not self.token or time.time() >= self.token_expiry:
-            if not self.login():
-                logger.error("Failed to authenticate, cannot make API request")
-                return None
+    def _login_error(self, error, responded):
+        """Handle a failed login request; `responded` is False if Crafty never answered"""
+        if not responded:
+            self.breaker.record_failure()
+        logger.error(f"Error authenticating with Crafty Controller: {error!r}")
+        return False
+    
+    def _record_outcome(self, status):
+        """Feed an HTTP status into the circuit breaker; None means no response"""
+        if status is None or status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+    
+    def _schedule_refresh(self):
+        """Make sure the background token refresher is running and knows the new expiry"""
+        if self.refresh_thread and self.refresh_thread.is_alive():
+            self.refresh_wake.set()
+            return
         
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.token}"
-            }
-            url = f"{self.api_url}/{endpoint.lstrip('/')}"
-            
-            if method == "GET":
-                response = requests.get(url, headers=headers, verify=False)
-            elif method == "POST":
-                response = requests.post(url, headers=headers, json=data, verify=False)
+        self.refresh_thread = threading.Thread(target=self._refresh_token_loop, name="crafty-token-refresh")
+        self.refresh_thread.daemon = True
+        self.refresh_thread.start()
+    
+    def _refresh_token_loop(self):
+        """Renew the token shortly before it expires so requests never wait for a login"""
+        while not self.closed:
+            if self._refresh_wait() <= 0:
+                delay = self._refresh_delay(self.login(force=True))
             else:
-                logger.error(f"Unsupported HTTP method: {method}")
+                delay = self._refresh_delay()
+            
+            self.refresh_wake.wait(delay)
+            self.refresh_wake.clear()
+    
+    def _refresh_wait(self):
+        """Seconds until the token is due for renewal"""
+        return self.token_expiry - self.token_refresh_margin - time.time()
+    
+    def _refresh_delay(self, logged_in=True):
+        """Seconds for the refresher to sleep before its next check
+        
+        After a failed renewal it waits for the login backoff to pass. It
+        never renews back to back, however short the token TTL.
+        """
+        wait = self._refresh_wait() if logged_in else self.login_retry_at - time.monotonic()
+        return max(wait, self.token_refresh_min_wait)
+    
+    def _make_request(self, endpoint, method="GET", data=None, metric_label=None, on_not_found=None):
+        """Make a request to the Crafty API
+        
+        `metric_label` groups the request latency, e.g. "servers/{id}/stats"
+        for all servers; it defaults to the endpoint itself. `on_not_found` is
+        called if Crafty answers 404. Expired tokens, connection errors and
+        server errors are retried up to CRAFTY_MAX_RETRIES times.
+        """
+        url = f"{self.api_url}/{endpoint.lstrip('/')}"
+        latency = CRAFTY_REQUEST_SECONDS.labels(self.name, metric_label or endpoint)
+        
+        for attempt in range(self.max_retries + 1):
+            # Fail fast while Crafty is known to be down
+            if not self.breaker.allow_request():
+                logger.debug(f"Crafty is unreachable, skipping request to {endpoint}")
                 return None
-                
-            response.raise_for_status()
             
-            data = response.json()
-            if data.get("status") == "ok" and "data" in data:
-                return data["data"]
-            else:
-                logger.error(f"Unexpected API response format: {data}")
+            # Try to login if we don't have a valid token
+            if not self._token_valid() and not self.login():
+                logger.error("Failed to authenticate, cannot make API request")
                 return None
+            
+            token = self.token
+            try:
+                headers = {
+                    "Authorization": f"Bearer {token}"
+                }
                 
-        except RequestException as e:
-            # Check if it's an authentication error
-            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 401:
-                logger.warning("Authentication token expired, attempting to re-authenticate")
-                self.token = ""
-                self.token_expiry = 0
+                started = time.perf_counter()
+                try:
+                    if method == "GET":
+                        response = self.session.get(url, headers=headers, timeout=self.timeout)
+                    elif method == "POST":
+                        response = self.session.post(url, headers=headers, json=data, timeout=self.timeout)
+                    else:
+                        logger.error(f"Unsupported HTTP method: {method}")
+                        return None
+                finally:
+                    latency.observe(time.perf_counter() - started)
+                    
+                self._record_outcome(response.status_code)
+                response.raise_for_status()
                 
-                # Try one more time with a fresh login
-                return self._make_request(endpoint, method, data)
-            
-            logger.error(f"Error making request to {endpoint}: {e}")
+                return self._unwrap(response.json())
+                    
+            except RequestException as e:
+                status = e.response.status_code if getattr(e, 'response', None) is not None else None
+                delay = self._request_failed(endpoint, e, status, token, attempt, on_not_found)
+                if delay is None:
+                    return None
+                if delay:
+                    time.sleep(delay)
+        
+        logger.error(f"Giving up on {endpoint} after {self.max_retries + 1} attempts")
+        return None
+    
+    @staticmethod
+    def _unwrap(payload):
+        """Get the data from an API response, or None if it isn't a successful one"""
+        if payload.get("status") == "ok" and "data" in payload:
+            return payload["data"]
+        logger.error(f"Unexpected API response format: {payload}")
+        return None
+    
+    def _request_failed(self, endpoint, error, status, token, attempt, on_not_found=None):
+        """Decide how to go on after a failed request made with `token`
+        
+        `status` is the HTTP status, or None if Crafty never answered. Returns
+        the delay in seconds before retrying (0 to retry right away), or None
+        to give up.
+        """
+        if status is None:
+            self._record_outcome(None)
+        
+        # Check if it's an authentication error
+        if status == 401:
+            logger.warning("Authentication token expired, attempting to re-authenticate")
+            # Only drop the token we used; another caller may already have replaced it
+            if self.token == token:
+                self.token_expiry = 0
+            return 0
+        
+        if status == 404 and on_not_found:
+            on_not_found()
+        
+        # Connection problems and server errors are worth retrying
+        if (status is None or status >= 500) and attempt < self.max_retries:
+            delay = self._backoff(attempt + 1)
+            logger.warning(f"Error making request to {endpoint}: {error!r}, retrying in {delay:.1f}s")
+            return delay
+        
+        logger.error(f"Error making request to {endpoint}: {error!r}")
+        return None
+    
+    def get_servers(self, force=False):
+        """Fetch the list of servers from Crafty Controller
+        
+        The list is cached for INVENTORY_TTL seconds; pass `force` to bypass the cache.
+        Returns None if it could not be fetched and no last known list applies.
+        """
+        cached = self._cached_inventory(force)
+        if cached is not None:
+            return cached
+        return self._store_inventory(self._make_request("servers"))
+    
+    def _cached_inventory(self, force=False):
+        """Get the cached server list while it is fresh, or None if it has to be fetched"""
+        with self.inventory_lock:
+            if not force and self.inventory is not None and time.monotonic() < self.inventory_expiry:
+                self.inventory_hits.inc()
+                return self.inventory
+        
+        self.inventory_misses.inc()
+        return None
+    
+    def _store_inventory(self, servers):
+        """Cache a freshly fetched server list (None if fetching failed); returns the list to use"""
+        if servers is None:
+            # Degraded mode: keep working from the last known list while Crafty is down
+            if self.breaker.is_open and self.inventory:
+                logger.warning("Crafty is unreachable, using the last known server list")
+                return self.inventory
             return None
+        
+        with self.inventory_lock:
+            self.inventory = servers
+            self.inventory_ids = {server.get("server_id") for server in servers}
+            self.inventory_expiry = time.monotonic() + self.inventory_ttl
+        return servers
+    
+    def invalidate_servers(self):
+        """Drop the cached server list so the next get_servers() call refetches it"""
+        with self.inventory_lock:
+            self.inventory = None
+            self.inventory_expiry = 0
     
-    def get_servers(self):
-        """Fetch the list of servers from Crafty Controller"""
-        return self._make_request("servers") or []
+    def _server_not_found(self, server_id):
+        """Invalidate the server list when a server we know about has disappeared"""
+        if server_id in self.inventory_ids:
+            logger.info(f"Server {server_id} no longer exists, invalidating server list")
+            self.invalidate_servers()
     
     def get_server_stats(self, server_id):
         """Get stats for a specific server"""
-        return self._make_request(f"servers/{server_id}/stats")
+        return self._make_request(
+            f"servers/{server_id}/stats",
+            metric_label="servers/{id}/stats",
+            on_not_found=lambda: self._server_not_found(server_id)
+        )
     
     def is_server_running(self, server_id):
         """Check if a server is running"""
@@ -139,13 +417,24 @@ class CraftyAPI:
         if not stats:
             return None
             
-        server_info = stats.get("server_id", {})
-        
-        return {
-            "name": server_info.get("server_name", "Unknown Server"),
-            "port": stats.get("server_port", 25565),
-            "description": stats.get("desc", "A Minecraft Server"),
-            "version": stats.get("version", "Unknown"),
-            "max_players": stats.get("max", 20),
-            "online_players": stats.get("online", 0),
-        }
\ No newline at end of file
+        return self._parse_server_info(stats)
+    
+    def get_server_snapshot(self, server_id):
+        """Get the running flag and server info from a single stats request
+        
+        Returns a (running, ServerStatus) tuple, or (False, None) if the stats could not be fetched.
+        """
+        return self._snapshot(self.get_server_stats(server_id))
+    
+    @classmethod
+    def _snapshot(cls, stats):
+        """Turn a stats response (None if it failed) into a (running, ServerStatus) tuple"""
+        if not stats:
+            return False, None
+        
+        return stats.get("running", False), cls._parse_server_info(stats)
+    
+    @staticmethod
+    def _parse_server_info(stats):
+        """Normalize a stats response into a ServerStatus"""
+        return ServerStatus.from_stats(stats)
\ No newline at end of file
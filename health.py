@@ -0,0 +1,55 @@
+import os
+import time
+import logging
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.health')
+
+class ServiceHealth:
+    """Class to report liveness and readiness for /healthz and /readyz
+    
+    The broadcaster is alive while the broadcast scheduler runs and no
+    controller loop has stalled, and ready once any controller has polled
+    every server in its list, i.e. once it announces what is actually running.
+    """
+    
+    def __init__(self, controllers, scheduler, stall_timeout=None, check_interval=None):
+        """Initialize the health checks for the given controllers and broadcast scheduler"""
+        self.controllers = controllers
+        self.scheduler = scheduler
+        # A controller loop legitimately sleeps for up to a check interval
+        check_interval = float(check_interval or os.environ.get("CHECK_INTERVAL", "30"))
+        self.stall_timeout = max(float(stall_timeout or os.environ.get("HEALTH_STALL_TIMEOUT", "300")),
+                                 2 * check_interval)
+        self.started = time.monotonic()
+    
+    def live(self):
+        """Check liveness; returns (alive, details)"""
+        now = time.monotonic()
+        broadcasting = self.scheduler.is_alive()
+        stalled = [controller.name for controller in self.controllers
+                   if now - controller.last_tick > self.stall_timeout]
+        if stalled:
+            logger.warning(f"Controller loop stalled for over {self.stall_timeout}s: {', '.join(stalled)}")
+        
+        return broadcasting and not stalled, {
+            'uptime': round(now - self.started, 1),
+            'broadcasting': broadcasting,
+            'stalled': stalled
+        }
+    
+    def ready(self):
+        """Check readiness; returns (ready, details)"""
+        controllers = {
+            controller.name: {
+                'ready': controller.ready,
+                'announced': controller.announce,
+                'servers': len(controller.servers),
+                'active': controller.tracker.active_count
+            }
+            for controller in self.controllers
+        }
+        return any(controller.ready for controller in self.controllers), {
+            'controllers': controllers,
+            'announced': len(self.scheduler.get_servers())
+        }
\ No newline at end of file
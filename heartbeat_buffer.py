@@ -0,0 +1,92 @@
+import threading
+
+class HeartbeatBuffer:
+    """Thread-safe fixed-capacity ring buffer of heartbeat log entries
+    
+    Every entry is tagged with a monotonically increasing sequence id under
+    the "id" key. Appends are O(1) and never copy the buffer; reads copy out
+    only the requested range.
+    """
+    
+    def __init__(self, capacity=1000):
+        """Initialize an empty buffer holding at most `capacity` entries"""
+        if capacity < 1:
+            raise ValueError("Heartbeat buffer capacity must be at least 1")
+        self.capacity = capacity
+        self._entries = [None] * capacity
+        self._first_seq = 1  # Oldest id held; restored buffers may start later than capacity allows
+        self._next_seq = 1
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        with self._lock:
+            return self._next_seq - self._first_seq
+    
+    @property
+    def last_seq(self):
+        """Sequence id of the newest entry, or 0 if the buffer is empty"""
+        with self._lock:
+            return self._next_seq - 1
+    
+    def append(self, entry):
+        """Store an entry, overwriting the oldest one when full; returns its id"""
+        with self._lock:
+            seq = self._next_seq
+            entry["id"] = seq
+            self._entries[(seq - 1) % self.capacity] = entry
+            self._next_seq = seq + 1
+            self._first_seq = max(self._first_seq, self._next_seq - self.capacity)
+        return seq
+    
+    def restore(self, entries, last_seq):
+        """Replace the contents with previously stored entries and continue numbering after `last_seq`
+        
+        `entries` are the newest stored entries with consecutive ids; there may
+        be fewer of them than `last_seq`, e.g. when only some are restored.
+        """
+        entries = entries[-self.capacity:]
+        with self._lock:
+            self._entries = [None] * self.capacity
+            for entry in entries:
+                self._entries[(entry["id"] - 1) % self.capacity] = entry
+            self._next_seq = last_seq + 1
+            self._first_seq = entries[0]["id"] if entries else self._next_seq
+    
+    def _range(self, first_seq, last_seq):
+        """Copy out entries first_seq..last_seq (inclusive); caller holds the lock"""
+        if first_seq > last_seq:
+            return []
+        start = (first_seq - 1) % self.capacity
+        end = start + (last_seq - first_seq + 1)
+        if end <= self.capacity:
+            return self._entries[start:end]
+        return self._entries[start:] + self._entries[:end - self.capacity]
+    
+    def latest(self, limit=None):
+        """Get up to `limit` of the newest entries, oldest first"""
+        with self._lock:
+            last_seq = self._next_seq - 1
+            count = last_seq - self._first_seq + 1
+            if limit is not None:
+                count = min(count, max(limit, 0))
+            return self._range(last_seq - count + 1, last_seq)
+    
+    def since(self, seq, limit=None):
+        """Get entries with an id greater than `seq`, oldest first
+        
+        Entries that have already been overwritten or were never restored are skipped. With `limit`,
+        only the newest `limit` matching entries are returned.
+        """
+        with self._lock:
+            last_seq = self._next_seq - 1
+            first_seq = max(seq + 1, self._first_seq)
+            if limit is not None:
+                first_seq = max(first_seq, last_seq - max(limit, 0) + 1)
+            return self._range(first_seq, last_seq)
+    
+    def last(self):
+        """Get the newest entry, or None if the buffer is empty"""
+        with self._lock:
+            if self._next_seq == self._first_seq:
+                return None
+            return self._entries[(self._next_seq - 2) % self.capacity]
\ No newline at end of file
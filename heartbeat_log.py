@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import mmap
+import time
+import struct
+import bisect
+import logging
+import threading
+from server_status import json_default
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.heartbeat_log')
+
+# Every record is a fixed header followed by the entry as compact JSON
+RECORD_HEADER = struct.Struct("<IQd")  # payload length, sequence id, unix time
+SEGMENT_NAME = re.compile(r"^heartbeats-(\d+)\.log$")
+
+class _Segment:
+    """One segment file of the heartbeat log with a sparse in-memory index"""
+    
+    def __init__(self, path, first_seq):
+        """Initialize an empty segment whose first record has id `first_seq`"""
+        self.path = path
+        self.first_seq = first_seq
+        self.last_seq = first_seq - 1
+        self.last_time = 0.0
+        self.size = 0
+        self.count = 0
+        # Sequence id, time and file offset of every index_interval-th record
+        self.index_seqs = []
+        self.index_times = []
+        self.index_offsets = []
+    
+    def add(self, seq, timestamp, offset, end, index_interval):
+        """Account for a record stored at offset..end"""
+        if self.count % index_interval == 0:
+            self.index_seqs.append(seq)
+            self.index_times.append(timestamp)
+            self.index_offsets.append(offset)
+        self.count += 1
+        self.last_seq = seq
+        self.last_time = timestamp
+        self.size = end
+    
+    def offset_for_seq(self, seq):
+        """Offset of the last indexed record at or before `seq`"""
+        i = bisect.bisect_right(self.index_seqs, seq) - 1
+        return self.index_offsets[i] if i >= 0 else 0
+    
+    def offset_for_time(self, timestamp):
+        """Offset of the last indexed record strictly before `timestamp`"""
+        i = bisect.bisect_left(self.index_times, timestamp) - 1
+        return self.index_offsets[i] if i >= 0 else 0
+
+class HeartbeatLog:
+    """Append-only, segment-rotated on-disk heartbeat history
+    
+    Entries are stored as length-prefixed JSON records in files named after
+    their first sequence id. Reads go through read-only memory maps, so old
+    history is paged in from disk on demand instead of being held in memory.
+    """
+    
+    def __init__(self, directory, segment_size=None, retention_days=None, index_interval=None):
+        """Open (or create) the log in `directory` and index the existing segments"""
+        self.directory = directory
+        self.segment_size = int(segment_size or os.environ.get("HEARTBEAT_SEGMENT_SIZE", str(4 * 1024 * 1024)))
+        self.retention = float(retention_days or os.environ.get("HEARTBEAT_RETENTION_DAYS", "30")) * 86400
+        self.index_interval = int(index_interval or os.environ.get("HEARTBEAT_INDEX_INTERVAL", "64"))
+        self.segments = []
+        self.file = None  # The newest segment, opened for appending
+        self.lock = threading.Lock()
+        
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        
+        logger.info(f"Opened heartbeat log in {directory} with {len(self.segments)} segments, "
+                    f"last id {self.last_seq}")
+    
+    @property
+    def last_seq(self):
+        """Sequence id of the newest stored entry, or 0 if the log is empty"""
+        return self.segments[-1].last_seq if self.segments else 0
+    
+    @property
+    def first_seq(self):
+        """Sequence id of the oldest stored entry"""
+        return self.segments[0].first_seq if self.segments else 1
+    
+    def _load(self):
+        """Index the segments found on disk and reopen the newest one for appending"""
+        found = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        
+        for first_seq, path in sorted(found):
+            segment = _Segment(path, first_seq)
+            valid = self._scan(segment)
+            if valid < os.path.getsize(path):
+                # A crash in the middle of a write leaves a partial record behind
+                logger.warning(f"Truncating {os.path.getsize(path) - valid} bytes of a partial record in {path}")
+                os.truncate(path, valid)
+            if segment.count:
+                self.segments.append(segment)
+            else:
+                os.remove(path)
+        
+        if self.segments:
+            self.file = open(self.segments[-1].path, "ab")
+    
+    def _scan(self, segment):
+        """Build a segment's index from its record headers; returns the length of the valid data"""
+        with open(segment.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset = 0
+                while offset + RECORD_HEADER.size <= size:
+                    length, seq, timestamp = RECORD_HEADER.unpack_from(data, offset)
+                    end = offset + RECORD_HEADER.size + length
+                    if end > size:
+                        break
+                    segment.add(seq, timestamp, offset, end, self.index_interval)
+                    offset = end
+        return offset
+    
+    def append(self, entry):
+        """Store an entry that already carries its sequence id under "id"
+        
+        Errors are logged rather than raised so a full disk can't stop the broadcaster.
+        """
+        seq = entry["id"]
+        timestamp = time.time()
+        payload = json.dumps(entry, separators=(",", ":"), default=json_default).encode()
+        record = RECORD_HEADER.pack(len(payload), seq, timestamp) + payload
+        
+        with self.lock:
+            try:
+                if self.file is None or self.segments[-1].size >= self.segment_size:
+                    self._rotate(seq)
+                
+                segment = self.segments[-1]
+                self.file.write(record)
+                self.file.flush()
+                segment.add(seq, timestamp, segment.size, segment.size + len(record), self.index_interval)
+            except OSError as e:
+                logger.error(f"Error writing heartbeat to {self.directory}: {e}")
+    
+    def _rotate(self, first_seq):
+        """Start a new segment and drop segments past the retention period; caller holds the lock"""
+        if self.file is not None:
+            self.file.close()
+        
+        path = os.path.join(self.directory, f"heartbeats-{first_seq:012d}.log")
+        self.file = open(path, "ab")
+        self.segments.append(_Segment(path, first_seq))
+        
+        cutoff = time.time() - self.retention
+        while len(self.segments) > 1 and self.segments[0].last_time < cutoff:
+            expired = self.segments.pop(0)
+            logger.info(f"Removing expired heartbeat segment {expired.path}")
+            try:
+                os.remove(expired.path)
+            except OSError as e:
+                logger.error(f"Error removing {expired.path}: {e}")
+    
+    def _snapshot(self):
+        """Copy the segment list and each segment's readable size"""
+        with self.lock:
+            return [(segment, segment.size) for segment in self.segments]
+    
+    @staticmethod
+    def _records(segment, size, offset, payloads=True):
+        """Yield (seq, time, payload) for a segment's records from `offset` up to `size`
+        
+        Without `payloads` only the headers are read and the payload is None.
+        """
+        if size == 0:
+            return
+        with open(segment.path, "rb") as f:
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as data:
+                while offset < size:
+                    length, seq, timestamp = RECORD_HEADER.unpack_from(data, offset)
+                    start = offset + RECORD_HEADER.size
+                    offset = start + length
+                    yield seq, timestamp, data[start:offset] if payloads else None
+    
+    def read(self, first_seq, last_seq):
+        """Get the entries with ids first_seq..last_seq (inclusive), oldest first"""
+        entries = []
+        for segment, size in self._snapshot():
+            if segment.last_seq < first_seq:
+                continue
+            if segment.first_seq > last_seq:
+                break
+            
+            records = self._records(segment, size, segment.offset_for_seq(first_seq))
+            for seq, _, payload in records:
+                if seq > last_seq:
+                    break
+                if seq >= first_seq:
+                    entries.append(json.loads(payload))
+            records.close()
+        return entries
+    
+    def since(self, seq, limit=None):
+        """Get entries with an id greater than `seq`, oldest first; same semantics as HeartbeatBuffer.since()"""
+        last_seq = self.last_seq
+        first_seq = max(seq + 1, self.first_seq)
+        if limit is not None:
+            first_seq = max(first_seq, last_seq - max(limit, 0) + 1)
+        return self.read(first_seq, last_seq)
+    
+    def latest(self, limit):
+        """Get up to `limit` of the newest entries, oldest first"""
+        return self.since(0, limit)
+    
+    def _seq_at(self, timestamp, inclusive):
+        """Id of the first entry written at or after `timestamp` (after it unless `inclusive`)"""
+        for segment, size in self._snapshot():
+            if segment.last_time < timestamp or (not inclusive and segment.last_time == timestamp):
+                continue
+            
+            records = self._records(segment, size, segment.offset_for_time(timestamp), payloads=False)
+            for seq, written, _ in records:
+                if written > timestamp or (inclusive and written == timestamp):
+                    records.close()
+                    return seq
+        return self.last_seq + 1
+    
+    def between(self, start=None, end=None, limit=None):
+        """Get entries written between the unix times `start` and `end` (inclusive), oldest first
+        
+        With `limit`, only the newest `limit` matching entries are returned.
+        """
+        first_seq = self._seq_at(start, True) if start is not None else self.first_seq
+        last_seq = self._seq_at(end, False) - 1 if end is not None else self.last_seq
+        if limit is not None:
+            first_seq = max(first_seq, last_seq - max(limit, 0) + 1)
+        if first_seq > last_seq:
+            return []
+        return self.read(first_seq, last_seq)
+    
+    def close(self):
+        """Close the segment opened for appending"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
\ No newline at end of file
@@ -2,9 +2,13 @@ import os
 import time
 import logging
 import json
-from crafty_api import CraftyAPI
+import threading
 from minecraft_broadcaster import MinecraftBroadcaster
-from web_server import HeartbeatWebServer
+from broadcast_scheduler import BroadcastScheduler
+from controllers import AnnouncementMerger, create_controllers
+from timeseries import ServerTimeSeries
+from health import ServiceHealth
+from metrics import POLL_CYCLE_SECONDS
 
 # Configure logging
 logging.basicConfig(
@@ -13,100 +17,278 @@ logging.basicConfig(
 )
 logger = logging.getLogger('minecraft_broadcaster.main')
 
+def get_server_ids(servers):
+    """Extract the server IDs from a Crafty server list"""
+    server_ids = []
+    for server in servers:
+        if not server.get("server_id"):
+            logger.warning(f"Server missing ID: {server}")
+            continue
+        server_ids.append(server["server_id"])
+    return server_ids
+
+def poll_servers(poller, poll_scheduler, tracker, server_ids, timeseries=None, source=None, on_fetched=None):
+    """Check the given servers once and schedule their next checks
+    
+    Each server costs exactly one stats request, issued concurrently. The
+    snapshots are diffed against the previous state; servers that went up or
+    down or were updated are polled again soon, the others (including those
+    whose player counts merely moved) back off. `on_fetched` is passed on to
+    the poller to see each server's result as soon as it arrives.
+    Returns the list of change events.
+    """
+    # Fetch running state and server information for all due servers at once
+    snapshots = poller.poll(server_ids, on_fetched)
+    return apply_snapshots(poll_scheduler, tracker, snapshots, timeseries, source)
+
+def apply_snapshots(poll_scheduler, tracker, snapshots, timeseries=None, source=None):
+    """Diff freshly polled snapshots into the tracker and reschedule the polled servers
+    
+    Every snapshot is also recorded as a player count sample in `timeseries`,
+    under "<source>/<server ID>" when a source controller is given.
+    Returns the list of change events.
+    """
+    if timeseries is not None:
+        timeseries.record_snapshots(snapshots, source=source)
+    
+    events = tracker.update(snapshots)
+    # Player counts move constantly on busy servers; only state changes are polled again soon
+    changed = {event.server_id for event in events if event.kind != "players"}
+    
+    for server_id in snapshots:
+        poll_scheduler.reschedule(server_id, server_id in changed, tracker.is_running(server_id))
+    
+    return events
+
 def main():
     """Main function to check server status and broadcast active servers"""
+    # "threaded" (default) or "asyncio" for a single event loop driving everything
+    runtime_mode = os.environ.get("RUNTIME_MODE", "threaded").lower()
+    if runtime_mode == "asyncio":
+        try:
+            import asyncio
+            import async_runtime
+        except ImportError as e:
+            logger.warning(f"asyncio runtime is unavailable ({e}), falling back to the threaded runtime")
+        else:
+            asyncio.run(async_runtime.run())
+            return
+    
     # Get configuration from environment
     check_interval = int(os.environ.get("CHECK_INTERVAL", "30"))
     enable_web_server = os.environ.get("ENABLE_WEB_SERVER", "true").lower() in ("true", "1", "yes")
     
-    # Initialize API client and broadcaster
-    crafty = CraftyAPI()
+    # Initialize one API client and poller per controller, and the shared broadcaster
+    controllers = create_controllers()
+    timeseries = ServerTimeSeries()
     broadcaster = MinecraftBroadcaster()
+    scheduler = BroadcastScheduler(broadcaster)
+    merger = AnnouncementMerger(controllers, scheduler)
+    health = ServiceHealth(controllers, scheduler, check_interval=check_interval)
     
-    # Initialize and start web server if enabled
     web_server = None
     if enable_web_server:
-        web_server = HeartbeatWebServer()
-        web_server.start()
+        # Imported here so the web stack is only loaded when it is enabled
+        from web_server import HeartbeatWebServer
+        web_server = HeartbeatWebServer(timeseries=timeseries, health=health)
     
     logger.info("Starting Minecraft server broadcaster...")
     logger.info(f"Check interval: {check_interval} seconds")
+    logger.info(f"Broadcast interval: {scheduler.interval} seconds")
     
-    # Initial authentication
-    if not crafty.login():
-        logger.error("Failed to authenticate with Crafty Controller. Check credentials.")
-        return
+    # Announce from the start; servers are added as soon as they are found running
+    scheduler.start()
     
-    while True:
-        try:
-            # Fetch servers from Crafty Controller
-            servers = crafty.get_servers()
+    # Each controller logs in and fetches its server list in its own thread, so
+    # controllers bootstrap in parallel with each other and with the web server,
+    # and a slow one can't delay the others. Failures are retried, not fatal.
+    threads = []
+    for controller in controllers:
+        thread = threading.Thread(target=run_controller, name=f"controller-{controller.name}",
+                                  args=(controller, merger, web_server, timeseries, check_interval))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    
+    # Flask is imported and the app built in the web server's own thread
+    if web_server:
+        web_server.start()
+    
+    for thread in threads:
+        thread.join()
+
+class ControllerLoop:
+    """Class to hold the steps of one controller's polling loop
+    
+    Both runtimes drive a controller with the same steps and differ only in
+    how they wait for Crafty: run_controller() here calls these steps around
+    blocking requests, async_runtime.run_controller() around awaited ones.
+    """
+    
+    def __init__(self, controller, merger, web_server, timeseries, check_interval):
+        """Initialize the loop for one controller"""
+        self.controller = controller
+        self.merger = merger
+        self.web_server = web_server
+        self.timeseries = timeseries
+        self.check_interval = check_interval
+        self.cycle_seconds = POLL_CYCLE_SECONDS.labels(controller.name)
+        self.prefix = f"{controller.source}: " if controller.source else ""
+        self.retry_delay = controller.retry_delay  # First retry delay after a failed server list fetch
+        self.events = []
+        self.polled = False
+        self.cycle_started = 0.0
+    
+    def begin(self):
+        """Start a pass through the loop"""
+        self.controller.last_tick = time.monotonic()
+        self.cycle_started = time.perf_counter()
+        self.events = []
+        self.polled = False
+    
+    def inventory_due(self):
+        """Check whether the server list needs refreshing
+        
+        It is refreshed every check interval (served from the client's cache
+        until it expires), or right after it was invalidated. The first fetch
+        also logs in.
+        """
+        return time.monotonic() >= self.controller.next_inventory or self.controller.crafty.inventory is None
+    
+    def apply_inventory(self, servers):
+        """Apply a freshly fetched server list, None if it could not be fetched
+        
+        Returns the number of seconds to wait before retrying after a failed
+        fetch, or None to go on polling.
+        """
+        controller = self.controller
+        controller.next_inventory = time.monotonic() + self.check_interval
+        
+        if servers is None:
+            logger.warning(f"{self.prefix}Could not connect to Crafty Controller, "
+                           f"retrying in {controller.retry_delay:.0f}s")
             
-            if not servers:
-                logger.warning("No servers found or could not connect to Crafty Controller")
-                
-                # Log to web server
-                if web_server:
-                    web_server.add_heartbeat("No servers found or could not connect to Crafty Controller")
-                
-                time.sleep(check_interval)
-                continue
-                
-            # Track active servers for this cycle
-            active_servers = []
+            # Log to web server
+            if self.web_server:
+                self.web_server.add_heartbeat(f"{self.prefix}Could not connect to Crafty Controller")
             
-            for server in servers:
-                server_id = server.get("server_id")
-                server_name = server.get("server_name")
-                
-                if not server_id:
-                    logger.warning(f"Server missing ID: {server}")
-                    continue
-                
-                # Check if server is running
-                if crafty.is_server_running(server_id):
-                    # Get server information
-                    server_info = crafty.get_server_info(server_id)
-                    
-                    if not server_info:
-                        logger.warning(f"Could not get info for server {server_id}")
-                        continue
-                    
-                    logger.info(f"Server {server_info['name']} is active on port {server_info['port']}")
-                    
-                    # Add to active servers
-                    active_servers.append({
-                        "id": server_id,
-                        "name": server_info['name'],
-                        "port": server_info['port'],
-                        "description": server_info['description'],
-                        "version": server_info['version'],
-                        "players": f"{server_info['online_players']}/{server_info['max_players']}"
-                    })
-                    
-                    # Generate MOTD and broadcast
-                    motd = broadcaster.generate_motd(server_info['name'], server_info['description'])
-                    broadcaster.broadcast_server(server_info['name'], motd, server_info['port'])
-                else:
-                    logger.info(f"Server {server_name} is not active")
+            # Stop announcing servers we haven't heard of for too long
+            if controller.inventory_expired():
+                logger.warning(f"{self.prefix}No server list for over {controller.poller.grace_period:.0f}s, "
+                               f"no longer announcing its servers")
+                events = controller.forget_servers()
+                self.merger.update(controller)
+                if self.web_server and events:
+                    self.web_server.add_heartbeat({"controller": controller.name, "events": events,
+                                                   "total_servers": 0, "total_active": 0})
             
-            # Log heartbeat to web server
-            if web_server:
-                web_server.add_heartbeat({
-                    "active_servers": active_servers,
-                    "total_servers": len(servers),
-                    "total_active": len(active_servers)
+            # Retry quickly at first, backing off to the check interval
+            delay = controller.retry_delay
+            controller.retry_delay = min(controller.retry_delay * 2, max(self.check_interval, self.retry_delay))
+            return delay
+        
+        if not servers:
+            logger.warning(f"{self.prefix}No servers found in Crafty Controller")
+        
+        controller.servers = servers
+        controller.last_inventory = time.monotonic()
+        controller.retry_delay = self.retry_delay
+        server_ids = get_server_ids(servers)
+        controller.poll_scheduler.sync(server_ids)
+        self.events.extend(controller.tracker.retain(server_ids))
+        if self.timeseries is not None:
+            self.timeseries.retain(server_ids, controller.source)
+        self.polled = True
+        return None
+    
+    def on_fetched(self):
+        """Poller callback that announces servers found running before the controller is ready, or None"""
+        if self.controller.ready:
+            return None
+        
+        def announce_early(server_id, running, info):
+            if running and info:
+                self.merger.announce_early(self.controller, info)
+        return announce_early
+    
+    def apply_poll(self, snapshots):
+        """Apply the snapshots of the servers polled in this pass"""
+        controller = self.controller
+        self.events.extend(apply_snapshots(controller.poll_scheduler, controller.tracker, snapshots,
+                                           self.timeseries, controller.source))
+        self.polled = True
+    
+    def finish(self, due):
+        """Publish the pass: update the announcements, readiness, metrics and heartbeat log"""
+        controller = self.controller
+        events = self.events
+        
+        # Announced at the scheduler's own rate until the next change replaces them
+        if events:
+            self.merger.update(controller)
+        
+        if not self.polled:
+            return
+        
+        # The first passes may only cover POLL_RATE_LIMIT servers each
+        if not controller.poll_scheduler.unpolled:
+            controller.ready = True
+        self.cycle_seconds.observe(time.perf_counter() - self.cycle_started)
+        
+        # Log changes to web server; unchanged cycles only refresh the last update time
+        if self.web_server:
+            if events:
+                self.web_server.add_heartbeat({
+                    "controller": controller.name,
+                    "events": events,
+                    "total_servers": len(controller.servers),
+                    "total_active": controller.tracker.active_count,
+                    "polled": len(due),
+                    "cycle_time_ms": round(controller.poller.last_cycle_time * 1000)
                 })
+            else:
+                self.web_server.touch()
+    
+    def failed(self, error):
+        """Report an unexpected error in a pass"""
+        logger.error(f"{self.prefix}Error in main loop: {error!r}")
+        
+        # Log error to web server
+        if self.web_server:
+            self.web_server.add_heartbeat(f"{self.prefix}Error: {str(error)}")
+    
+    def wait(self):
+        """Seconds until the next server is due or the server list needs refreshing"""
+        now = time.monotonic()
+        wait = self.controller.next_inventory - now
+        next_poll = self.controller.poll_scheduler.time_until_next(now)
+        if next_poll is not None:
+            wait = min(wait, next_poll)
+        return max(wait, 0.1)
+
+def run_controller(controller, merger, web_server, timeseries, check_interval):
+    """Poll one controller forever and feed its servers into the merged announcements"""
+    loop = ControllerLoop(controller, merger, web_server, timeseries, check_interval)
+    
+    while True:
+        loop.begin()
+        try:
+            if loop.inventory_due():
+                retry = loop.apply_inventory(controller.crafty.get_servers())
+                if retry is not None:
+                    time.sleep(retry)
+                    continue
             
+            # Poll only the servers that are due, within the request budget
+            due = controller.poll_scheduler.pop_due()
+            if due:
+                loop.apply_poll(controller.poller.poll(due, loop.on_fetched()))
+            loop.finish(due)
+        
         except Exception as e:
-            logger.error(f"Error in main loop: {e}")
-            
-            # Log error to web server
-            if web_server:
-                web_server.add_heartbeat(f"Error: {str(e)}")
+            loop.failed(e)
         
-        # Wait before checking again
-        time.sleep(check_interval)
+        time.sleep(loop.wait())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,208 @@
+import threading
+from bisect import bisect_left
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label_value(value):
+    """Escape a label value as the text exposition format requires"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, labelvalues, extra=""):
+    """Render a Prometheus label set like {endpoint="servers",le="0.5"}"""
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    """Render a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class for metrics with an optional fixed set of label names
+    
+    Children for each label combination are created once on first use and
+    reused afterwards, so recording a sample doesn't allocate a new metric.
+    """
+    
+    type_name = "untyped"
+    
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        """Initialize the metric and register it"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.labelvalues = ()
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+    
+    def labels(self, *labelvalues):
+        """Get the child metric for a label combination"""
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.get(labelvalues)
+                if child is None:
+                    child = self._new_child()
+                    child.labelnames = self.labelnames
+                    child.labelvalues = labelvalues
+                    self._children[labelvalues] = child
+        return child
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def _samples(self):
+        """Yield (suffix, labels, value) for this metric without its children"""
+        raise NotImplementedError
+    
+    def collect(self):
+        """Render the metric in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        metrics = list(self._children.values()) if self.labelnames else [self]
+        for metric in metrics:
+            for suffix, labels, value in metric._samples():
+                lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """A monotonically increasing counter; names should end in _total"""
+    
+    type_name = "counter"
+    
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.value = 0
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def _new_child(self):
+        return Counter(self.name, self.documentation, registry=_DISCARD)
+    
+    def inc(self, amount=1):
+        """Increase the counter"""
+        with self._lock:
+            self.value += amount
+    
+    def _samples(self):
+        yield "", _format_labels(self.labelnames, self.labelvalues), self.value
+
+class Gauge(_Metric):
+    """A value that can go up and down, or be read from a callback"""
+    
+    type_name = "gauge"
+    
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.value = 0
+        self._function = None
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def _new_child(self):
+        return Gauge(self.name, self.documentation, registry=_DISCARD)
+    
+    def set(self, value):
+        """Set the gauge"""
+        self.value = value
+    
+    def set_function(self, function):
+        """Read the gauge from `function` at collection time"""
+        self._function = function
+    
+    def _samples(self):
+        value = self._function() if self._function else self.value
+        yield "", _format_labels(self.labelnames, self.labelvalues), value
+
+class Histogram(_Metric):
+    """A histogram with fixed, preallocated buckets"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def _new_child(self):
+        return Histogram(self.name, self.documentation, buckets=self.buckets, registry=_DISCARD)
+    
+    def observe(self, value):
+        """Record one sample"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+    
+    def _samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            yield "_bucket", _format_labels(self.labelnames, self.labelvalues, f'le="{_format_value(bound)}"'), cumulative
+        yield "_sum", _format_labels(self.labelnames, self.labelvalues), total
+        yield "_count", _format_labels(self.labelnames, self.labelvalues), count
+
+class MetricsRegistry:
+    """Collection of metrics exposed on /metrics"""
+    
+    def __init__(self):
+        """Initialize an empty registry"""
+        self.metrics = []
+    
+    def register(self, metric):
+        """Add a metric to the registry"""
+        self.metrics.append(metric)
+    
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+class _DiscardRegistry:
+    """Registry for label children, which are rendered through their parent"""
+    
+    def register(self, metric):
+        pass
+
+REGISTRY = MetricsRegistry()
+_DISCARD = _DiscardRegistry()
+
+# Crafty API client, per controller
+CRAFTY_REQUEST_SECONDS = Histogram(
+    "crafty_request_duration_seconds", "Latency of Crafty API requests by endpoint", ("controller", "endpoint"))
+CRAFTY_LOGINS = Counter("crafty_logins_total", "Number of logins to Crafty Controller", ("controller",))
+CRAFTY_LOGIN_SECONDS = Histogram(
+    "crafty_login_duration_seconds", "Latency of Crafty Controller logins", ("controller",))
+CRAFTY_CIRCUIT_OPEN = Gauge(
+    "crafty_circuit_open", "1 while the Crafty circuit breaker refuses requests", ("controller",))
+CRAFTY_INVENTORY_CACHE = Counter(
+    "crafty_inventory_cache_requests_total", "Server list lookups by cache result", ("controller", "result"))
+
+# Server List Ping prober
+SLP_PROBES = Counter("slp_probes_total", "Server List Ping probes by result", ("result",))
+SLP_PROBE_SECONDS = Histogram("slp_probe_duration_seconds", "Latency of successful Server List Ping probes")
+
+# Main loop
+POLL_CYCLE_SECONDS = Histogram(
+    "poll_cycle_duration_seconds", "Duration of a full poll cycle", ("controller",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+# LAN broadcaster
+BROADCAST_PACKETS = Counter(
+    "broadcast_packets_sent_total", "Announcement packets sent by target", ("target", "interface"))
+BROADCAST_ERRORS = Counter(
+    "broadcast_send_errors_total", "Announcement send errors by target", ("target", "interface"))
+
+# Web server
+HEARTBEAT_BUFFER_ENTRIES = Gauge("heartbeat_buffer_entries", "Number of heartbeats held in memory")
+LOGS_RESPONSE_CACHE = Counter(
+    "logs_response_cache_requests_total", "Serialized /api/logs bodies by cache result", ("result",))
\ No newline at end of file
@@ -2,41 +2,223 @@ import os
 import socket
 import struct
 import logging
+import ipaddress
+from functools import lru_cache
+from metrics import BROADCAST_PACKETS, BROADCAST_ERRORS
+
+try:
+    import fcntl
+except ImportError:  # Interface enumeration is only available on Linux/Unix
+    fcntl = None
 
 # Get logger
 logger = logging.getLogger('minecraft_broadcaster.broadcaster')
 
+# ioctl requests and flags from <linux/sockios.h> and <net/if.h>
+SIOCGIFFLAGS = 0x8913
+SIOCGIFADDR = 0x8915
+SIOCGIFBRDADDR = 0x8919
+IFF_UP = 0x1
+IFF_BROADCAST = 0x2
+IFF_LOOPBACK = 0x8
+
+def _interface_ioctl(sock, request, name):
+    """Run an interface ioctl and return the raw ifreq result"""
+    return fcntl.ioctl(sock.fileno(), request, struct.pack('256s', name[:15].encode('utf-8')))
+
+def get_interface_addresses(names=None):
+    """Enumerate IPv4 interfaces as (name, address, broadcast address) tuples
+    
+    With no `names`, every interface that is up, not loopback and broadcast
+    capable is returned. Named interfaces are returned if they have an IPv4
+    address; without a broadcast address their own address is used as target.
+    """
+    if fcntl is None:
+        logger.warning("Interface enumeration is not supported on this platform")
+        return []
+    
+    interfaces = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for _, name in socket.if_nameindex():
+            if names is not None and name not in names:
+                continue
+            
+            try:
+                flags = struct.unpack('H', _interface_ioctl(sock, SIOCGIFFLAGS, name)[16:18])[0]
+                address = socket.inet_ntoa(_interface_ioctl(sock, SIOCGIFADDR, name)[20:24])
+            except OSError:
+                continue  # No IPv4 address
+            
+            if names is None and (not flags & IFF_UP or flags & IFF_LOOPBACK or not flags & IFF_BROADCAST):
+                continue
+            
+            broadcast = address
+            if flags & IFF_BROADCAST:
+                broadcast = socket.inet_ntoa(_interface_ioctl(sock, SIOCGIFBRDADDR, name)[20:24])
+            
+            interfaces.append((name, address, broadcast))
+    finally:
+        sock.close()
+    
+    return interfaces
+
+class BroadcastTarget:
+    """A single announcement destination with its own non-blocking socket"""
+    
+    def __init__(self, ip, port, source_ip="", interface=None):
+        """Initialize the target; `source_ip` pins the socket to one interface"""
+        self.ip = ip
+        self.port = port
+        self.source_ip = source_ip
+        self.interface = interface
+        self.address = (ip, port)
+        self.multicast = ipaddress.ip_address(ip).is_multicast
+        self.sock = None
+        self.sent = BROADCAST_PACKETS.labels(f"{ip}:{port}", interface or "")
+        self.errors = BROADCAST_ERRORS.labels(f"{ip}:{port}", interface or "")
+    
+    def __repr__(self):
+        via = f" via {self.interface}" if self.interface else ""
+        return f"{self.ip}:{self.port}{via}"
+    
+    def _get_socket(self):
+        """Get the target's socket, creating it if needed"""
+        if self.sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.multicast:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+                if self.source_ip:
+                    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.source_ip))
+            if self.source_ip:
+                sock.bind((self.source_ip, 0))
+            # A full send buffer drops the packet instead of stalling the other targets
+            sock.setblocking(False)
+            self.sock = sock
+        return self.sock
+    
+    def send(self, data):
+        """Send one datagram, counting successes and failures"""
+        try:
+            self._get_socket().sendto(data, self.address)
+            self.sent.inc()
+            return True
+        except BlockingIOError:
+            self.errors.inc()
+            logger.debug(f"Send buffer full for {self}, dropping announcement")
+            return False
+        except OSError as e:
+            self.errors.inc()
+            logger.error(f"Error sending announcement to {self}: {e}")
+            # Recreate the socket on the next send in case it went bad
+            self.close()
+            return False
+    
+    def close(self):
+        """Close the target's socket"""
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+    
+    def get_stats(self):
+        """Get the send counters for this target"""
+        return {
+            "target": f"{self.ip}:{self.port}",
+            "interface": self.interface,
+            "sent": self.sent.value,
+            "errors": self.errors.value
+        }
+
 class MinecraftBroadcaster:
     """Class to broadcast Minecraft servers on LAN"""
     
-    def __init__(self, broadcast_ip=None, broadcast_port=None):
-        """Initialize the Minecraft broadcaster"""
+    def __init__(self, broadcast_ip=None, broadcast_port=None, interfaces=None):
+        """Initialize the Minecraft broadcaster
+        
+        `broadcast_ip` may be a comma-separated list of broadcast or multicast
+        addresses. `interfaces` is "auto" or a comma-separated list of interface
+        names; each selected interface gets its own target and socket.
+        """
         self.broadcast_ip = broadcast_ip or os.environ.get("BROADCAST_IP", "255.255.255.255")
         self.broadcast_port = int(broadcast_port or os.environ.get("MINECRAFT_BROADCAST_PORT", "4445"))
+        self.interfaces = interfaces if interfaces is not None else os.environ.get("BROADCAST_INTERFACES", "")
+        self.targets = self._build_targets()
+        
+        logger.info(f"Initialized Minecraft broadcaster for: {', '.join(map(repr, self.targets))}")
+    
+    def _build_targets(self):
+        """Create the list of announcement targets from the configuration"""
+        targets = [BroadcastTarget(ip.strip(), self.broadcast_port)
+                   for ip in self.broadcast_ip.split(",") if ip.strip()]
+        
+        if self.interfaces:
+            names = None
+            if self.interfaces.strip().lower() != "auto":
+                names = {name.strip() for name in self.interfaces.split(",") if name.strip()}
+            
+            for name, address, broadcast in get_interface_addresses(names):
+                targets.append(BroadcastTarget(broadcast, self.broadcast_port, source_ip=address, interface=name))
+        
+        if not targets:
+            logger.warning("No broadcast targets configured")
         
-        logger.info(f"Initialized Minecraft broadcaster for: {self.broadcast_ip}:{self.broadcast_port}")
+        return targets
+    
+    def close(self):
+        """Close all target sockets"""
+        for target in self.targets:
+            target.close()
+    
+    def get_stats(self):
+        """Get per-target send and error counters"""
+        return [target.get_stats() for target in self.targets]
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def encode_announcement(motd, port):
+        """Encode the LAN announcement datagram for a MOTD and port
+        
+        Cached, so the packet is only rebuilt when the MOTD or port changes.
+        """
+        # Format the announcement message according to Minecraft LAN protocol
+        announcement = f"[MOTD]{motd}[/MOTD][AD]{port}[/AD]"
+        return bytes(bytearray([0x00, 0x00]) + struct.pack('>h', len(announcement)) + announcement.encode('utf-8'))
     
     def broadcast_server(self, server_name, motd, port):
-        """Broadcast a Minecraft server to the LAN"""
+        """Broadcast a Minecraft server to every target
+        
+        Returns True if at least one target accepted the announcement.
+        """
         try:
-            # Create UDP socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            
-            # Format the announcement message according to Minecraft LAN protocol
-            announcement = f"[MOTD]{motd}[/MOTD][AD]{port}[/AD]"
-            
-            # Encode and send the message
-            data = bytearray([0x00, 0x00]) + struct.pack('>h', len(announcement)) + announcement.encode('utf-8')
-            sock.sendto(data, (self.broadcast_ip, self.broadcast_port))
-            
-            logger.info(f"Broadcasted server {server_name} on port {port} with MOTD: {motd}")
-            sock.close()
-            return True
+            data = self.encode_announcement(motd, port)
         except Exception as e:
             logger.error(f"Error broadcasting server {server_name}: {e}")
             return False
+        
+        sent = False
+        for target in self.targets:
+            if target.send(data):
+                sent = True
+        
+        if sent:
+            logger.debug(f"Broadcasted server {server_name} on port {port} with MOTD: {motd}")
+        return sent
+    
+    def broadcast_many(self, servers):
+        """Broadcast several servers to every target in one pass
+        
+        `servers` is an iterable of (name, motd, port) tuples.
+        Returns the number of servers that reached at least one target.
+        """
+        sent = 0
+        for server_name, motd, port in servers:
+            if self.broadcast_server(server_name, motd, port):
+                sent += 1
+        
+        logger.debug(f"Broadcasted {sent} servers")
+        return sent
     
     @staticmethod
     def generate_motd(server_name, server_desc):
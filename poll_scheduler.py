@@ -0,0 +1,116 @@
+import os
+import time
+import heapq
+import logging
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.poll_scheduler')
+
+class PollScheduler:
+    """Class to decide when each server is polled next
+    
+    Servers sit in a priority queue keyed on their next due time. Every poll
+    that finds a server unchanged backs its interval off (up to `max_interval`
+    for stopped servers and `max_running_interval` for running ones); a state
+    change resets it to `min_interval`. Player count changes don't count as
+    state changes, so busy servers settle at `max_running_interval`. A token bucket caps the overall
+    request rate against Crafty.
+    """
+    
+    def __init__(self, min_interval=None, max_interval=None, max_running_interval=None,
+                 backoff=None, rate_limit=None):
+        """Initialize the scheduler from arguments or environment"""
+        self.min_interval = float(min_interval or os.environ.get("POLL_MIN_INTERVAL", "5"))
+        self.max_interval = float(max_interval or os.environ.get("POLL_MAX_INTERVAL", "120"))
+        self.max_running_interval = float(max_running_interval or os.environ.get("CHECK_INTERVAL", "30"))
+        self.backoff = float(backoff or os.environ.get("POLL_BACKOFF", "1.5"))
+        self.rate_limit = float(rate_limit or os.environ.get("POLL_RATE_LIMIT", "10"))  # requests per second
+        
+        self.queue = []  # (due time, server ID) heap; entries for removed servers are skipped lazily
+        self.intervals = {}  # server ID -> current interval
+        self.due_times = {}  # server ID -> due time of its live queue entry
+        self.unpolled = set()  # Servers that have never been rescheduled after a poll
+        
+        # Token bucket for the global request budget
+        self.tokens = self.rate_limit
+        self.tokens_updated = time.monotonic()
+        
+        logger.info(f"Initialized poll scheduler: {self.min_interval}-{self.max_interval}s intervals, "
+                    f"{self.rate_limit} requests/s budget")
+    
+    def sync(self, server_ids, now=None):
+        """Match the scheduled servers to the current inventory
+        
+        New servers are due immediately; servers no longer listed are dropped.
+        """
+        now = time.monotonic() if now is None else now
+        server_ids = set(server_ids)
+        
+        for server_id in server_ids - self.intervals.keys():
+            self.intervals[server_id] = self.min_interval
+            self.unpolled.add(server_id)
+            self._push(server_id, now)
+        
+        # Recover servers that were taken but never rescheduled (e.g. after an error)
+        for server_id in self.intervals.keys() - self.due_times.keys():
+            self._push(server_id, now)
+        
+        for server_id in self.intervals.keys() - server_ids:
+            del self.intervals[server_id]
+            self.due_times.pop(server_id, None)
+            self.unpolled.discard(server_id)
+    
+    def _push(self, server_id, due):
+        self.due_times[server_id] = due
+        heapq.heappush(self.queue, (due, server_id))
+    
+    def _refill(self, now):
+        """Add tokens for the time elapsed since the last refill"""
+        elapsed = max(0.0, now - self.tokens_updated)
+        self.tokens = min(self.rate_limit, self.tokens + elapsed * self.rate_limit)
+        self.tokens_updated = now
+    
+    def pop_due(self, now=None):
+        """Take the servers that are due now, within the request budget"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        
+        due = []
+        while self.queue and self.queue[0][0] <= now and self.tokens >= 1:
+            due_time, server_id = heapq.heappop(self.queue)
+            if self.due_times.get(server_id) != due_time:
+                continue  # Removed or rescheduled
+            del self.due_times[server_id]
+            self.tokens -= 1
+            due.append(server_id)
+        
+        return due
+    
+    def reschedule(self, server_id, changed, running, now=None):
+        """Schedule a polled server's next check based on what the poll found"""
+        if server_id not in self.intervals:
+            return
+        
+        now = time.monotonic() if now is None else now
+        if changed:
+            interval = self.min_interval
+        else:
+            limit = self.max_running_interval if running else self.max_interval
+            interval = min(self.intervals[server_id] * self.backoff, max(limit, self.min_interval))
+        
+        self.intervals[server_id] = interval
+        self.unpolled.discard(server_id)
+        self._push(server_id, now + interval)
+    
+    def time_until_next(self, now=None):
+        """Seconds until the next server is due and a request token is available"""
+        now = time.monotonic() if now is None else now
+        while self.queue and self.due_times.get(self.queue[0][1]) != self.queue[0][0]:
+            heapq.heappop(self.queue)  # Discard dead entries
+        
+        if not self.queue:
+            return None
+        
+        self._refill(now)
+        wait_for_token = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate_limit
+        return max(self.queue[0][0] - now, wait_for_token, 0.0)
\ No newline at end of file
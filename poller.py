@@ -0,0 +1,144 @@
+import os
+import time
+import logging
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from slp_prober import SLPProber
+from server_status import ServerSnapshot
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.poller')
+
+class StatsPoller:
+    """Class to poll server stats from Crafty Controller concurrently"""
+    
+    def __init__(self, crafty, max_workers=None, deadline=None):
+        """Initialize the poller with a bounded worker pool"""
+        self.crafty = crafty
+        self.max_workers = int(max_workers or os.environ.get("POLL_WORKERS", "8"))
+        self.deadline = float(deadline or os.environ.get("POLL_DEADLINE", "10"))
+        # How long a server's last good snapshot stands in while its stats can't be fetched
+        self.grace_period = float(os.environ.get("DEGRADED_GRACE_PERIOD", "300"))
+        self.executor = None  # Created on the first poll
+        self.last_snapshots = {}  # server ID -> (fetch time, last good snapshot)
+        self.last_cycle_time = 0.0
+        
+        # Server List Ping: "off", "primary" (ask the servers first) or "fallback" (when Crafty fails)
+        self.slp_mode = os.environ.get("SLP_MODE", "off").lower()
+        self.slp_host = os.environ.get("SLP_HOST", "") or urlparse(crafty.api_url).hostname or "localhost"
+        self.prober = SLPProber() if self.slp_mode in ("primary", "fallback") else None
+        
+        logger.info(f"Initialized stats poller with {self.max_workers} workers and a {self.deadline}s deadline")
+        if self.prober:
+            logger.info(f"Server List Ping is the {self.slp_mode} status source, probing {self.slp_host}")
+    
+    def poll(self, server_ids, on_fetched=None):
+        """Fetch a snapshot for every server concurrently
+        
+        Returns a dict mapping server ID to a ServerSnapshot, in the
+        order of `server_ids`. Servers that miss the deadline or whose stats could
+        not be fetched (e.g. while Crafty is down) keep their last good snapshot,
+        marked stale, for up to DEGRADED_GRACE_PERIOD seconds instead of being
+        reported as stopped.
+        
+        With SLP_MODE=primary, servers with a known port are pinged directly and
+        only those that don't answer are asked from Crafty; with
+        SLP_MODE=fallback, servers Crafty couldn't report on are pinged.
+        
+        `on_fetched(server_id, running, info)` is called for each Crafty
+        answer as it arrives, before the whole cycle completes.
+        """
+        start = time.monotonic()
+        probed = self._probe(server_ids) if self.slp_mode == "primary" else {}
+        fetched = self._fetch_all([server_id for server_id in server_ids if server_id not in probed], on_fetched)
+        if self.slp_mode == "fallback":
+            probed = self._probe([server_id for server_id, (_, info) in fetched.items() if info is None])
+        return self._collect(server_ids, fetched, probed, start)
+    
+    def _fetch_all(self, server_ids, on_fetched=None):
+        """Ask Crafty for every server's snapshot; returns {server ID: (running, info)}
+        
+        Failed fetches and servers that miss the deadline get (False, None).
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stats-poller")
+        futures = {self.executor.submit(self.crafty.get_server_snapshot, server_id): server_id
+                   for server_id in server_ids}
+        fetched = dict.fromkeys(server_ids, (False, None))
+        
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                server_id = futures[future]
+                try:
+                    fetched[server_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Error polling server {server_id}: {e}")
+                    continue
+                if on_fetched is not None:
+                    on_fetched(server_id, *fetched[server_id])
+        except FuturesTimeoutError:
+            for future, server_id in futures.items():
+                if not future.done():
+                    # Don't wait for it; reuse what we knew last cycle
+                    future.cancel()
+                    logger.warning(f"Stats for server {server_id} missed the {self.deadline}s deadline")
+        return fetched
+    
+    def _probe(self, server_ids):
+        """Ping servers whose port is known from an earlier Crafty snapshot
+        
+        Returns {server ID: info} for the servers that answered. Only the
+        player counts come from the ping; everything else is the last known
+        info from Crafty, so the description doesn't flip between Crafty's and
+        the ping's color-stripped MOTD from one cycle to the next.
+        """
+        known = {}
+        for server_id in server_ids:
+            _, previous = self.last_snapshots.get(server_id, (None, None))
+            if previous is not None and previous.info:
+                known[server_id] = previous.info
+        if not known:
+            return {}
+        
+        statuses = self.prober.probe_many((self.slp_host, info.port) for info in known.values())
+        probed = {}
+        for server_id, info in known.items():
+            status = statuses.get((self.slp_host, info.port))
+            if status is not None:
+                probed[server_id] = info.replace(online_players=status["online"], max_players=status["max"])
+        return probed
+    
+    def _collect(self, server_ids, fetched, probed, start):
+        """Turn fetched and probed results into snapshots, in the order of `server_ids`"""
+        results = {}
+        for server_id in server_ids:
+            if server_id in probed:
+                results[server_id] = self._snapshot(server_id, True, probed[server_id], start)
+            else:
+                running, info = fetched.get(server_id, (False, None))
+                results[server_id] = self._snapshot(server_id, running, info, start)
+        
+        self.last_cycle_time = time.monotonic() - start
+        logger.info(f"Polled {len(results)} servers in {self.last_cycle_time * 1000:.0f} ms")
+        return results
+    
+    def _snapshot(self, server_id, running, info, now):
+        """Build a server's snapshot, remembering it if the fetch succeeded (`info` is not None)"""
+        if info is None:
+            return self._last_good_snapshot(server_id, now)
+        
+        snapshot = ServerSnapshot(running, info)
+        self.last_snapshots[server_id] = (now, snapshot)
+        return snapshot
+    
+    def _last_good_snapshot(self, server_id, now):
+        """Get the last good snapshot marked stale, or "not running" once the grace period is over"""
+        fetched_at, previous = self.last_snapshots.get(server_id, (None, None))
+        if previous is None or now - fetched_at > self.grace_period:
+            return ServerSnapshot(False, None, stale=True)
+        return ServerSnapshot(previous.running, previous.info, stale=True)
+    
+    def shutdown(self):
+        """Stop the worker pool without waiting for in-flight requests"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -0,0 +1,113 @@
+import logging
+from minecraft_broadcaster import MinecraftBroadcaster
+from server_status import ServerEvent
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.state')
+
+class TrackedServer:
+    """Class to hold what the tracker knows about one server between cycles"""
+    
+    __slots__ = ("running", "info", "motd")
+    
+    def __init__(self, running, info, motd):
+        """Initialize the entry; `info` and `motd` are None while the server is down"""
+        self.running = running
+        self.info = info
+        self.motd = motd
+
+class ServerStateTracker:
+    """Class to track server state across poll cycles and report what changed
+    
+    Each cycle's snapshots are diffed against the previous cycle, so MOTDs are
+    only regenerated for servers whose name or description changed and the
+    heartbeat log only records compact change events.
+    """
+    
+    def __init__(self):
+        """Initialize with no known servers"""
+        self.servers = {}  # server ID -> TrackedServer
+    
+    def update(self, snapshots):
+        """Apply one cycle of snapshots and return the list of change events
+        
+        `snapshots` maps server IDs to poller ServerSnapshots; it may cover
+        only some of the servers.
+        """
+        events = []
+        
+        for server_id, snapshot in snapshots.items():
+            info = snapshot.info
+            running = bool(snapshot.running and info)
+            previous = self.servers.get(server_id)
+            was_running = previous is not None and previous.running
+            
+            if snapshot.running and not info:
+                logger.warning(f"Could not get info for server {server_id}")
+            
+            if running and not was_running:
+                logger.info(f"Server {info.name} is active on port {info.port}")
+                self.servers[server_id] = self._entry(info)
+                events.append(self._event("up", server_id, info))
+            elif running:
+                old_info = previous.info
+                if old_info != info:
+                    events.append(self._changed_event(server_id, old_info, info))
+                    # Only rebuild the MOTD when its inputs changed
+                    if not old_info.same_motd(info):
+                        previous.motd = MinecraftBroadcaster.generate_motd(info.name, info.description)
+                    previous.info = info
+            elif was_running:
+                logger.info(f"Server {previous.info.name} is not active")
+                events.append(self._event("down", server_id, previous.info))
+                self.servers[server_id] = TrackedServer(False, None, None)
+            elif previous is None:
+                self.servers[server_id] = TrackedServer(False, None, None)
+        
+        return events
+    
+    def retain(self, server_ids):
+        """Forget servers that are no longer in the inventory
+        
+        Returns "down" events for removed servers that were running.
+        """
+        events = []
+        server_ids = set(server_ids)
+        
+        for server_id in [server_id for server_id in self.servers if server_id not in server_ids]:
+            previous = self.servers.pop(server_id)
+            if previous.running:
+                logger.info(f"Server {previous.info.name} was removed")
+                events.append(self._event("down", server_id, previous.info))
+        
+        return events
+    
+    def is_running(self, server_id):
+        """Check whether a tracked server is currently running"""
+        entry = self.servers.get(server_id)
+        return entry is not None and entry.running
+    
+    @staticmethod
+    def _entry(info):
+        """Create the tracked state for a running server, building its MOTD"""
+        return TrackedServer(True, info, MinecraftBroadcaster.generate_motd(info.name, info.description))
+    
+    @staticmethod
+    def _event(kind, server_id, info):
+        """Create a compact change event referencing the server's status"""
+        return ServerEvent(kind, server_id, info)
+    
+    def _changed_event(self, server_id, old, new):
+        """Create a "players" event if only the player counts changed, else "updated\""""
+        kind = "players" if old.same_server(new) else "updated"
+        return self._event(kind, server_id, new)
+    
+    @property
+    def active_count(self):
+        """Number of servers currently running"""
+        return sum(1 for entry in self.servers.values() if entry.running)
+    
+    def announcements(self):
+        """Get (name, motd, port) tuples for the broadcast scheduler"""
+        return [(entry.info.name, entry.motd, entry.info.port)
+                for entry in self.servers.values() if entry.running]
\ No newline at end of file
@@ -0,0 +1,120 @@
+import sys
+from typing import NamedTuple
+
+def _intern(value):
+    """Intern a string so every cycle's copy of it shares one object"""
+    return sys.intern(str(value))
+
+class ServerStatus(NamedTuple):
+    """Class to hold one server's status as reported by Crafty or a Server List Ping
+    
+    A typed named tuple, so it has no per-instance dict and compares field by
+    field in C. Build it with create() or from_stats(): they intern names,
+    descriptions and versions, so the same server's status from consecutive
+    cycles shares its strings and comparing two statuses mostly compares
+    pointers and small ints.
+    """
+    
+    name: str
+    port: int
+    description: str
+    version: str
+    max_players: int
+    online_players: int
+    
+    @classmethod
+    def create(cls, name, port, description, version, max_players, online_players):
+        """Build a status, interning its strings and normalizing its numbers
+        
+        Crafty reports some numbers as null (e.g. players while a server
+        starts); those count as 0.
+        """
+        return cls(_intern(name), int(port or 0), _intern(description), _intern(version),
+                   int(max_players or 0), int(online_players or 0))
+    
+    @classmethod
+    def from_stats(cls, stats):
+        """Build a status from a Crafty stats response"""
+        server_info = stats.get("server_id", {})
+        
+        return cls.create(
+            server_info.get("server_name", "Unknown Server"),
+            stats.get("server_port", 25565),
+            stats.get("desc", "A Minecraft Server"),
+            stats.get("version", "Unknown"),
+            stats.get("max", 20),
+            stats.get("online", 0)
+        )
+    
+    def replace(self, **changes):
+        """Return a copy with some fields changed"""
+        fields = self._asdict()
+        fields.update(changes)
+        return ServerStatus.create(**fields)
+    
+    def same_motd(self, other):
+        """Check whether the MOTD inputs (name and description) are unchanged"""
+        return self.name == other.name and self.description == other.description
+    
+    def same_server(self, other):
+        """Check whether everything except the player counts is unchanged"""
+        return self[:4] == other[:4]
+    
+    def to_json(self):
+        """Serialize for the API"""
+        return self._asdict()
+
+class ServerSnapshot:
+    """Class to hold one poll result: whether a server runs, its status and whether it is stale"""
+    
+    __slots__ = ("running", "info", "stale")
+    
+    def __init__(self, running: bool, info: "ServerStatus | None", stale: bool = False):
+        """Initialize the snapshot; `info` is None if nothing is known about the server"""
+        self.running = bool(running)
+        self.info = info
+        self.stale = stale
+
+class ServerEvent:
+    """Class to record a change of one server's state in the heartbeat log
+    
+    The event references the server's status rather than copying its fields,
+    so a retained heartbeat costs one small object per changed server.
+    """
+    
+    __slots__ = ("kind", "server_id", "status")
+    
+    def __init__(self, kind: str, server_id: str, status: ServerStatus):
+        """Initialize the event; `kind` is "up", "down", "players" or "updated\""""
+        self.kind = _intern(kind)
+        self.server_id = _intern(server_id)
+        self.status = status
+    
+    def __repr__(self):
+        return f"ServerEvent({self.kind!r}, {self.server_id!r}, {self.status!r})"
+    
+    def to_json(self):
+        """Serialize for the API and the heartbeat log"""
+        status = self.status
+        return {
+            "event": self.kind,
+            "id": self.server_id,
+            "name": status.name,
+            "port": status.port,
+            "online": status.online_players,
+            "max": status.max_players
+        }
+
+def json_default(obj):
+    """`default` hook for JSON encoders that serializes status records
+    
+    orjson doesn't serialize tuple subclasses and asks this hook, which
+    returns a ServerStatus as an object. The standard encoder turns it into
+    an array without asking, so code that hands statuses to an encoder
+    should call to_json() itself.
+    """
+    if isinstance(obj, ServerEvent):
+        return obj.to_json()
+    if isinstance(obj, ServerStatus):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
\ No newline at end of file
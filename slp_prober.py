@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import time
+import errno
+import socket
+import struct
+import logging
+import selectors
+from collections import deque
+from metrics import SLP_PROBES, SLP_PROBE_SECONDS
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.slp_prober')
+
+# Section sign formatting codes (colors, bold, ...) in legacy MOTDs
+FORMATTING_CODES = re.compile("§.")
+
+def _varint(value):
+    """Encode a Minecraft protocol VarInt (negative values use their 32-bit two's complement)"""
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _read_varint(data, offset):
+    """Decode a VarInt at `offset`; returns (value, next offset), or None if more data is needed"""
+    value = 0
+    for i in range(5):
+        if offset + i >= len(data):
+            return None
+        byte = data[offset + i]
+        value |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return value, offset + i + 1
+    raise ValueError("VarInt is too long")
+
+def build_status_request(host, port, protocol_version=-1):
+    """Build the handshake (next state: status) followed by the status request packet"""
+    host_bytes = host.encode("utf-8")
+    handshake = (_varint(0x00) + _varint(protocol_version) + _varint(len(host_bytes)) + host_bytes +
+                 struct.pack(">H", port) + _varint(1))
+    return _varint(len(handshake)) + handshake + _varint(1) + _varint(0x00)
+
+def parse_status_response(data):
+    """Parse a status response packet; returns the JSON status, or None if more data is needed"""
+    header = _read_varint(data, 0)
+    if header is None:
+        return None
+    length, offset = header
+    if len(data) < offset + length:
+        return None
+    
+    packet_id, offset = _read_varint(data, offset)
+    if packet_id != 0x00:
+        raise ValueError(f"Unexpected packet id {packet_id:#x}")
+    string_length, offset = _read_varint(data, offset)
+    return json.loads(bytes(data[offset:offset + string_length]).decode("utf-8"))
+
+def _flatten_description(description):
+    """Turn a chat component (string, dict with "text"/"extra", or list) into plain text"""
+    if isinstance(description, str):
+        return FORMATTING_CODES.sub("", description)
+    if isinstance(description, list):
+        return "".join(_flatten_description(part) for part in description)
+    if isinstance(description, dict):
+        return _flatten_description(description.get("text", "")) + \
+            "".join(_flatten_description(part) for part in description.get("extra", []))
+    return ""
+
+class _Probe:
+    """State of one in-flight Server List Ping"""
+    
+    def __init__(self, target, sock, request, deadline):
+        self.target = target
+        self.sock = sock
+        self.outgoing = memoryview(request)
+        self.incoming = bytearray()
+        self.started = time.monotonic()
+        self.deadline = deadline
+        self.connected = False
+
+class SLPProber:
+    """Class to query Minecraft servers directly with the Server List Ping protocol
+    
+    Many servers are probed at once from a single thread: every probe is a
+    non-blocking socket driven by a selector, so a slow or dead server only
+    costs its own timeout.
+    """
+    
+    def __init__(self, timeout=None, max_concurrency=None, protocol_version=None):
+        """Initialize the prober"""
+        self.timeout = float(timeout or os.environ.get("SLP_TIMEOUT", "1.0"))
+        self.max_concurrency = int(max_concurrency or os.environ.get("SLP_MAX_CONCURRENCY", "256"))
+        # -1 asks the server to answer with whatever version it runs
+        self.protocol_version = int(protocol_version or os.environ.get("SLP_PROTOCOL_VERSION", "-1"))
+        self.ok = SLP_PROBES.labels("ok")
+        self.failed = SLP_PROBES.labels("error")
+        self.timed_out = SLP_PROBES.labels("timeout")
+        
+        logger.info(f"Initialized Server List Ping prober with a {self.timeout}s timeout")
+    
+    def probe(self, host, port):
+        """Probe a single server; returns its status dict or None"""
+        return self.probe_many([(host, port)]).get((host, port))
+    
+    def probe_many(self, targets):
+        """Probe (host, port) targets concurrently
+        
+        Returns a dict mapping each target to {"motd", "online", "max",
+        "version", "protocol", "latency_ms"}, or to None if the server didn't
+        answer in time.
+        """
+        results = {}
+        pending = deque(dict.fromkeys(targets))
+        addresses = self._resolve({host for host, _ in pending})
+        active = {}
+        selector = selectors.DefaultSelector()
+        
+        try:
+            while pending or active:
+                # Keep up to max_concurrency sockets in flight
+                while pending and len(active) < self.max_concurrency:
+                    target = pending.popleft()
+                    probe = self._start(target, addresses.get(target[0]))
+                    if probe is None:
+                        results[target] = None
+                        continue
+                    active[probe.sock] = probe
+                    selector.register(probe.sock, selectors.EVENT_WRITE, probe)
+                
+                if not active:
+                    continue
+                
+                now = time.monotonic()
+                wait = max(0.0, min(probe.deadline for probe in active.values()) - now)
+                for key, _ in selector.select(wait):
+                    probe = key.data
+                    status = self._advance(probe, selector)
+                    if status is not False:
+                        results[probe.target] = status
+                        self._finish(probe, selector, active)
+                
+                # Give up on servers that didn't answer in time
+                now = time.monotonic()
+                for probe in [probe for probe in active.values() if now >= probe.deadline]:
+                    self.timed_out.inc()
+                    logger.debug(f"Server List Ping to {probe.target[0]}:{probe.target[1]} timed out")
+                    results[probe.target] = None
+                    self._finish(probe, selector, active)
+        finally:
+            for probe in list(active.values()):
+                self._finish(probe, selector, active)
+            selector.close()
+        
+        return results
+    
+    def _resolve(self, hosts):
+        """Look up each host once per round so DNS doesn't block every probe"""
+        addresses = {}
+        for host in hosts:
+            try:
+                addresses[host] = socket.gethostbyname(host)
+            except OSError as e:
+                logger.warning(f"Could not resolve {host} for Server List Ping: {e}")
+        return addresses
+    
+    def _start(self, target, address):
+        """Open a non-blocking connection for one probe"""
+        host, port = target
+        if address is None:
+            self.failed.inc()
+            return None
+        
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            result = sock.connect_ex((address, port))
+        except OSError as e:
+            self.failed.inc()
+            logger.debug(f"Could not start Server List Ping to {host}:{port}: {e}")
+            return None
+        
+        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            logger.debug(f"Could not connect to {host}:{port} for Server List Ping: {os.strerror(result)}")
+            sock.close()
+            self.failed.inc()
+            return None
+        
+        request = build_status_request(host, port, self.protocol_version)
+        return _Probe(target, sock, request, time.monotonic() + self.timeout)
+    
+    def _advance(self, probe, selector):
+        """Make progress on a ready probe; returns its status, None on failure or False if not done"""
+        try:
+            if not probe.connected:
+                error = probe.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error:
+                    raise OSError(error, os.strerror(error))
+                probe.connected = True
+            
+            if probe.outgoing:
+                sent = probe.sock.send(probe.outgoing)
+                probe.outgoing = probe.outgoing[sent:]
+                if not probe.outgoing:
+                    selector.modify(probe.sock, selectors.EVENT_READ, probe)
+                return False
+            
+            data = probe.sock.recv(65536)
+            if not data:
+                raise ConnectionError("connection closed before the status response")
+            probe.incoming += data
+            status = parse_status_response(probe.incoming)
+            if status is None:
+                return False
+            latency = time.monotonic() - probe.started
+            result = self._normalize(status, latency)
+        except BlockingIOError:
+            return False
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.failed.inc()
+            logger.debug(f"Server List Ping to {probe.target[0]}:{probe.target[1]} failed: {e}")
+            return None
+        
+        SLP_PROBE_SECONDS.observe(latency)
+        self.ok.inc()
+        return result
+    
+    @staticmethod
+    def _normalize(status, latency):
+        """Pick the fields the broadcaster uses out of a status response"""
+        players = status.get("players") or {}
+        version = status.get("version") or {}
+        return {
+            "motd": _flatten_description(status.get("description", "")),
+            "online": int(players.get("online", 0)),
+            "max": int(players.get("max", 0)),
+            "version": version.get("name", "Unknown"),
+            "protocol": version.get("protocol"),
+            "latency_ms": round(latency * 1000, 1)
+        }
+    
+    @staticmethod
+    def _finish(probe, selector, active):
+        """Stop tracking a probe and close its socket"""
+        active.pop(probe.sock, None)
+        try:
+            selector.unregister(probe.sock)
+        except (KeyError, ValueError):
+            pass
+        probe.sock.close()
\ No newline at end of file
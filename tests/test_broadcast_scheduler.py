@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+from async_runtime import AsyncBroadcastScheduler
+from broadcast_scheduler import BroadcastScheduler
+
+
+class RecordingBroadcaster:
+    def __init__(self):
+        self.sent = []
+        self.lock = threading.Lock()
+    
+    def broadcast_many(self, servers):
+        servers = list(servers)
+        with self.lock:
+            self.sent.extend(servers)
+        return len(servers)
+    
+    def take(self):
+        with self.lock:
+            sent, self.sent = self.sent, []
+        return sent
+
+
+OLD = [("Old %d" % i, "A Minecraft Server", 25565 + i) for i in range(5)]
+NEW = ("New", "A Minecraft Server", 25600)
+
+
+def test_update_announces_only_added_servers_right_away():
+    broadcaster = RecordingBroadcaster()
+    scheduler = BroadcastScheduler(broadcaster, interval=1.0)
+    scheduler.update_servers(OLD)
+    scheduler.start()
+    try:
+        time.sleep(0.2)
+        assert broadcaster.take() == OLD
+        
+        # Repeated updates with the same servers send nothing before the next tick
+        for _ in range(5):
+            scheduler.update_servers(OLD + [NEW])
+        time.sleep(0.2)
+        assert broadcaster.take() == [NEW]
+        
+        time.sleep(0.8)
+        assert broadcaster.take() == OLD + [NEW]
+    finally:
+        scheduler.stop()
+
+
+def test_async_update_announces_only_added_servers_right_away():
+    async def scenario():
+        broadcaster = RecordingBroadcaster()
+        scheduler = AsyncBroadcastScheduler(broadcaster, interval=1.0)
+        scheduler.update_servers(OLD)
+        scheduler.start()
+        try:
+            await asyncio.sleep(0.2)
+            assert broadcaster.take() == OLD
+            
+            for _ in range(5):
+                scheduler.update_servers(OLD + [NEW])
+            await asyncio.sleep(0.2)
+            assert broadcaster.take() == [NEW]
+            
+            await asyncio.sleep(0.8)
+            assert broadcaster.take() == OLD + [NEW]
+        finally:
+            await scheduler.stop()
+    
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+from controllers import AnnouncementMerger, create_controllers
+from server_status import ServerSnapshot, ServerStatus
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.servers = []
+    
+    def update_servers(self, servers):
+        self.servers = list(servers)
+
+
+def running(name, port):
+    return ServerSnapshot(True, ServerStatus.create(name, port, "A Minecraft Server", "1.20.4", 20, 0))
+
+
+def test_servers_of_remote_controllers_are_polled_but_not_announced(monkeypatch):
+    monkeypatch.setenv("CRAFTY_CONTROLLERS", "local=https://127.0.0.1:8443/api/v2,remote=https://10.9.9.9:8443/api/v2")
+    local, remote = create_controllers()
+    scheduler = RecordingScheduler()
+    merger = AnnouncementMerger([local, remote], scheduler)
+    
+    local.tracker.update({"1": running("Local", 25565)})
+    remote.tracker.update({"1": running("Remote", 25565), "2": running("Other", 25566)})
+    merger.update(local)
+    merger.update(remote)
+    
+    assert (local.announce, remote.announce) == (True, False)
+    assert remote.tracker.active_count == 2
+    assert [name for name, _, _ in scheduler.servers] == ["Local"]
+
+
+def test_local_controllers_are_deduplicated_by_port(monkeypatch):
+    monkeypatch.setenv("CRAFTY_CONTROLLERS", "first=https://localhost:8443/api/v2,second=https://localhost:9443/api/v2")
+    first, second = create_controllers()
+    scheduler = RecordingScheduler()
+    merger = AnnouncementMerger([first, second], scheduler)
+    
+    first.tracker.update({"1": running("First", 25565)})
+    second.tracker.update({"1": running("Second", 25565), "2": running("Other", 25566)})
+    merger.update(second)
+    merger.update(first)
+    
+    assert sorted(name for name, _, _ in scheduler.servers) == ["First", "Other"]
@@ -0,0 +1,50 @@
+import pytest
+
+from web_server import HeartbeatWebServer
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setenv("HEARTBEAT_LOG_DIR", "")
+    monkeypatch.setenv("TEMPLATES_DIR", str(tmp_path))
+    server = HeartbeatWebServer()
+    server._configure_routes()
+    return server
+
+
+def test_small_bodies_share_the_identity_etag_across_encodings(server):
+    server.add_heartbeat("one")
+    client = server.app.test_client()
+    
+    plain = client.get("/api/logs")
+    gzipped = client.get("/api/logs", headers={"Accept-Encoding": "gzip"})
+    
+    assert "Content-Encoding" not in gzipped.headers
+    assert plain.headers["ETag"] == gzipped.headers["ETag"]
+    assert client.get("/api/logs", headers={"Accept-Encoding": "gzip",
+                                             "If-None-Match": plain.headers["ETag"]}).status_code == 304
+
+
+def test_compressed_bodies_get_their_own_etag(server):
+    server.compress_min_size = 0
+    server.add_heartbeat("one")
+    client = server.app.test_client()
+    
+    plain = client.get("/api/logs")
+    gzipped = client.get("/api/logs", headers={"Accept-Encoding": "gzip"})
+    
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert plain.headers["ETag"] != gzipped.headers["ETag"]
+
+
+def test_etags_from_an_earlier_process_do_not_match(server):
+    server.add_heartbeat("one")
+    etag = server.app.test_client().get("/api/logs").headers["ETag"]
+    
+    restarted = HeartbeatWebServer()
+    restarted._configure_routes()
+    restarted.add_heartbeat("other")
+    response = restarted.app.test_client().get("/api/logs", headers={"If-None-Match": etag})
+    
+    assert response.status_code == 200
+    assert response.json["logs"][0]["data"] == "other"
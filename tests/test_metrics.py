@@ -0,0 +1,11 @@
+from metrics import Counter, MetricsRegistry
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = Counter("test_requests_total", "Requests", ("controller",), registry=registry)
+    counter.labels('a "quoted"\\ name\nwith a newline').inc()
+    
+    sample = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    
+    assert sample == ['test_requests_total{controller="a \\"quoted\\"\\\\ name\\nwith a newline"} 1']
@@ -0,0 +1,57 @@
+import pytest
+
+from crafty_api import CraftyAPI
+from main import get_server_ids, poll_servers
+from poll_scheduler import PollScheduler
+from poller import StatsPoller
+from server_state import ServerStateTracker
+from stub_crafty import StubCraftyServer
+
+
+@pytest.fixture
+def stub():
+    stub = StubCraftyServer(server_count=40, latency=0.005).start()
+    yield stub
+    stub.stop()
+
+
+def stats_hits(stub):
+    return sum(n for path, n in stub.hits.items() if path.endswith("/stats"))
+
+
+@pytest.mark.parametrize("server_count", [10, 20, 40])
+def test_cycle_issues_one_stats_request_per_server(stub, server_count):
+    stub.servers = stub.servers[:server_count]
+    crafty = CraftyAPI(api_url=stub.api_url, username="test", password="test", pool_size=8)
+    poller = StatsPoller(crafty, max_workers=8, deadline=30)
+    try:
+        crafty.login()
+        stub.reset_hits()
+        
+        tracker = ServerStateTracker()
+        poll_servers(poller, PollScheduler(), tracker, get_server_ids(crafty.get_servers()))
+    finally:
+        poller.shutdown()
+        crafty.close()
+    
+    assert stats_hits(stub) == server_count
+    assert stub.hits["/api/v2/servers"] == 1
+    assert stub.hits["/api/v2/auth/login"] == 0
+    assert tracker.active_count == (server_count + 1) // 2
+
+
+def test_unchanged_servers_are_not_polled_again_before_they_are_due(stub):
+    crafty = CraftyAPI(api_url=stub.api_url, username="test", password="test")
+    poller = StatsPoller(crafty, max_workers=8, deadline=30)
+    scheduler = PollScheduler(rate_limit=1000)
+    tracker = ServerStateTracker()
+    try:
+        scheduler.sync(get_server_ids(crafty.get_servers()))
+        poll_servers(poller, scheduler, tracker, scheduler.pop_due())
+        stub.reset_hits()
+        
+        assert scheduler.pop_due() == []
+        assert stats_hits(stub) == 0
+    finally:
+        poller.shutdown()
+        crafty.close()
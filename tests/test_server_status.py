@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+from server_status import ServerEvent, ServerStatus, json_default
+
+
+def test_null_numbers_from_crafty_count_as_zero():
+    status = ServerStatus.from_stats({"server_id": {"server_name": "Lobby"}, "server_port": 25565,
+                                      "online": None, "max": None})
+    assert (status.online_players, status.max_players) == (0, 0)
+
+
+def test_json_default_serializes_events_and_statuses():
+    status = ServerStatus.create("Lobby", 25565, "Hi", "1.20.4", 20, 3)
+    payload = json.loads(json.dumps({"event": ServerEvent("up", "1", status)}, default=json_default))
+    
+    assert payload["event"] == {"event": "up", "id": "1", "name": "Lobby", "port": 25565, "online": 3, "max": 20}
+    assert json_default(status) == status.to_json()
+
+
+def test_json_default_serializes_statuses_for_orjson():
+    orjson = pytest.importorskip("orjson")
+    status = ServerStatus.create("Lobby", 25565, "Hi", "1.20.4", 20, 3)
+    assert orjson.loads(orjson.dumps([status], default=json_default)) == [status.to_json()]
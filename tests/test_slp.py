@@ -0,0 +1,141 @@
+import time
+
+import pytest
+
+from crafty_api import CraftyAPI
+from fake_slp import FakeSLPServer
+from poller import StatsPoller
+from server_state import ServerStateTracker
+from slp_prober import SLPProber, _read_varint, _varint
+from stub_crafty import StubCraftyServer
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 255, 25565, 2097151, 2147483647, -1])
+def test_varint_round_trip(value):
+    encoded = _varint(value)
+    assert _read_varint(encoded, 0) == (value & 0xFFFFFFFF, len(encoded))
+
+
+def test_incomplete_varint_asks_for_more_data():
+    assert _read_varint(b"\x80", 0) is None
+
+
+@pytest.fixture
+def fakes():
+    """Start fake SLP responders on demand and stop them all afterwards"""
+    started = []
+    
+    def start(**kwargs):
+        fake = FakeSLPServer(**kwargs).start()
+        started.append(fake)
+        return fake
+    yield start
+    for fake in started:
+        fake.stop()
+
+
+def test_probe_reads_status_and_strips_formatting(fakes):
+    fake = fakes(motd="§aHello §lworld", online=3, max_players=10, version="1.20.4")
+    status = SLPProber(timeout=0.5).probe("127.0.0.1", fake.port)
+    
+    assert status["motd"] == "Hello world"
+    assert (status["online"], status["max"], status["version"]) == (3, 10, "1.20.4")
+    assert fake.handshakes[-1] == (0xFFFFFFFF, "127.0.0.1", fake.port)
+
+
+def test_probe_parses_chunked_and_slow_responses(fakes):
+    prober = SLPProber(timeout=0.5)
+    assert prober.probe("127.0.0.1", fakes(online=1, chunked=True).port) is not None
+    assert prober.probe("127.0.0.1", fakes(delay=0.2).port) is not None
+
+
+def test_probe_times_out_on_silent_servers(fakes):
+    prober = SLPProber(timeout=0.5)
+    started = time.monotonic()
+    assert prober.probe("127.0.0.1", fakes(silent=True).port) is None
+    assert time.monotonic() - started < 0.8
+
+
+def test_probe_fails_fast_on_closed_ports():
+    closed = FakeSLPServer()
+    port = closed.port
+    closed.server.server_close()
+    assert SLPProber(timeout=0.5).probe("127.0.0.1", port) is None
+
+
+def test_probes_run_concurrently(fakes):
+    count = 50
+    crowd = [fakes(online=i % 7, delay=0.1) for i in range(count)]
+    silent = fakes(silent=True)
+    
+    started = time.monotonic()
+    results = SLPProber(timeout=0.5).probe_many([("127.0.0.1", fake.port) for fake in crowd] +
+                                                [("127.0.0.1", silent.port)])
+    
+    assert sum(1 for result in results.values() if result is not None) == count
+    # Each responder waits 0.1s; sequential probing would take count * 0.1s
+    assert time.monotonic() - started < 0.8
+
+
+@pytest.fixture
+def stub_with_fakes(fakes):
+    """Stub Crafty whose even servers run on ports answered by fake SLP responders"""
+    stub = StubCraftyServer(server_count=6).start()
+    pinged = {str(i): fakes(motd=f"§aReal MOTD {i}", online=7, max_players=12) for i in range(0, 6, 2)}
+    stats_for = stub.stats_for
+    
+    def stats_with_fake_ports(server_id):
+        stats = stats_for(server_id)
+        if server_id in pinged:
+            stats["server_port"] = pinged[server_id].port
+            stats["desc"] = f"§aCrafty description {server_id}"
+        return stats
+    stub.stats_for = stats_with_fake_ports
+    yield stub, pinged
+    stub.stop()
+
+
+@pytest.mark.parametrize("mode", ["primary", "fallback"])
+def test_poller_takes_player_counts_from_the_ping(monkeypatch, stub_with_fakes, mode):
+    stub, pinged = stub_with_fakes
+    monkeypatch.setenv("SLP_MODE", mode)
+    crafty = CraftyAPI(api_url=stub.api_url, username="u", password="p")
+    poller = StatsPoller(crafty)
+    server_ids = [str(i) for i in range(6)]
+    try:
+        poller.poll(server_ids)
+        stub.reset_hits()
+        if mode == "fallback":
+            stub.available = False
+        snapshots = poller.poll(server_ids)
+    finally:
+        poller.shutdown()
+        crafty.close()
+    
+    if mode == "primary":
+        # Only the servers without a ping answer are asked from Crafty
+        assert sum(n for path, n in stub.hits.items() if path.endswith("/stats")) == 3
+    
+    running = {server_id for server_id, snapshot in snapshots.items() if snapshot.running and not snapshot.stale}
+    assert running == set(pinged)
+    info = snapshots["0"].info
+    assert (info.online_players, info.max_players) == (7, 12)
+    assert info.description == "§aCrafty description 0"
+
+
+def test_pinged_servers_do_not_flip_between_descriptions(monkeypatch, stub_with_fakes):
+    stub, _ = stub_with_fakes
+    monkeypatch.setenv("SLP_MODE", "primary")
+    crafty = CraftyAPI(api_url=stub.api_url, username="u", password="p")
+    poller = StatsPoller(crafty)
+    tracker = ServerStateTracker()
+    server_ids = [str(i) for i in range(6)]
+    try:
+        # Crafty's answer first, then the pings; the player count changes once
+        events = [tracker.update(poller.poll(server_ids)) for _ in range(4)]
+    finally:
+        poller.shutdown()
+        crafty.close()
+    
+    assert [event.kind for event in events[1]] == ["players"] * 3
+    assert events[2] == events[3] == []
@@ -0,0 +1,184 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from array import array
+
+# Get logger
+logger = logging.getLogger('minecraft_broadcaster.timeseries')
+
+class _Series:
+    """Fixed-size ring of aggregated samples at one resolution
+    
+    Each bucket holds the start time, min/max/sum of online players, the
+    number of samples and how many of them saw the server up. With a `step`
+    of 0 every sample gets its own bucket (raw resolution). The arrays grow
+    with the buckets written until they reach `capacity`, so a short-lived
+    server or a coarse resolution that has seen few buckets stays small.
+    """
+    
+    def __init__(self, step, capacity):
+        """Initialize an empty ring"""
+        self.step = step
+        self.capacity = capacity
+        self.times = array('d')
+        self.mins = array('H')
+        self.maxs = array('H')
+        self.sums = array('d')
+        self.counts = array('I')
+        self.ups = array('I')
+        self.written = 0  # Buckets written so far; the ring holds the last `capacity`
+    
+    def __len__(self):
+        return min(self.written, self.capacity)
+    
+    def __getitem__(self, i):
+        """Start time of the i-th retained bucket, oldest first (lets bisect search the ring)"""
+        return self.times[self._slot(i)]
+    
+    def _slot(self, i):
+        """Array slot of the i-th retained bucket"""
+        return (self.written - len(self) + i) % self.capacity
+    
+    def add(self, now, players, up):
+        """Fold one sample into the current bucket, starting a new one when it is over"""
+        start = now - now % self.step if self.step else now
+        last = (self.written - 1) % self.capacity
+        if self.step and self.written and self.times[last] == start:
+            self.mins[last] = min(self.mins[last], players)
+            self.maxs[last] = max(self.maxs[last], players)
+            self.sums[last] += players
+            self.counts[last] += 1
+            self.ups[last] += up
+            return
+        
+        slot = self.written % self.capacity
+        if slot == len(self.times):
+            # Still filling the ring for the first time
+            self.times.append(start)
+            self.mins.append(players)
+            self.maxs.append(players)
+            self.sums.append(players)
+            self.counts.append(1)
+            self.ups.append(up)
+        else:
+            self.times[slot] = start
+            self.mins[slot] = self.maxs[slot] = players
+            self.sums[slot] = players
+            self.counts[slot] = 1
+            self.ups[slot] = up
+        self.written += 1
+    
+    def buckets(self, start, end):
+        """Yield (time, min, max, sum, count, up) for buckets starting within start..end"""
+        for i in range(bisect.bisect_left(self, start), bisect.bisect_right(self, end)):
+            slot = self._slot(i)
+            yield (self.times[slot], self.mins[slot], self.maxs[slot],
+                   self.sums[slot], self.counts[slot], self.ups[slot])
+
+class ServerTimeSeries:
+    """Class to keep per-server player counts and up/down state as numeric time series
+    
+    Every sample is stored raw and downsampled on the fly into 1-minute and
+    1-hour buckets, each resolution in its own fixed-size ring. Queries are
+    answered from the coarsest resolution that still fits the requested step.
+    """
+    
+    def __init__(self, raw_samples=None, minutes=None, hours=None):
+        """Initialize the ring sizes for each resolution"""
+        self.capacities = (
+            (0, int(raw_samples or os.environ.get("TIMESERIES_RAW_SAMPLES", "720"))),
+            (60, int(minutes or os.environ.get("TIMESERIES_MINUTES", "1440"))),  # One day
+            (3600, int(hours or os.environ.get("TIMESERIES_HOURS", "720"))),  # 30 days
+        )
+        self.series = {}  # server ID -> [_Series per resolution, finest first]
+        self.lock = threading.Lock()
+        
+        logger.info("Initialized time series with " +
+                    ", ".join(f"{capacity} x {step or 'raw'}" for step, capacity in self.capacities))
+    
+    def record(self, server_id, players, up, now=None):
+        """Record one sample of a server's online players and whether it is up"""
+        now = time.time() if now is None else now
+        players = max(0, min(int(players), 0xFFFF))
+        with self.lock:
+            series = self.series.get(server_id)
+            if series is None:
+                series = self.series[server_id] = [_Series(step, capacity) for step, capacity in self.capacities]
+            for resolution in series:
+                resolution.add(now, players, int(bool(up)))
+    
+    def record_snapshots(self, snapshots, now=None, source=None):
+        """Record a sample for every server in a poll cycle's snapshots
+        
+        With `source`, servers are stored as "<source>/<server ID>" so IDs from
+        different controllers can't collide.
+        """
+        now = time.time() if now is None else now
+        for server_id, snapshot in snapshots.items():
+            info = snapshot.info
+            up = bool(snapshot.running and info)
+            players = info.online_players if up else 0
+            self.record(self._key(server_id, source), players, up, now)
+    
+    def retain(self, server_ids, source=None):
+        """Drop the series of a controller's servers that are no longer in its inventory"""
+        keep = {self._key(server_id, source) for server_id in server_ids}
+        prefix = f"{source}/" if source else ""
+        with self.lock:
+            for key in [key for key in self.series if key.startswith(prefix) and key not in keep]:
+                del self.series[key]
+    
+    @staticmethod
+    def _key(server_id, source):
+        """Series key of a server, prefixed with its controller when there are several"""
+        return f"{source}/{server_id}" if source else server_id
+    
+    def server_ids(self):
+        """Get the IDs of all servers with samples"""
+        with self.lock:
+            return list(self.series)
+    
+    @staticmethod
+    def _resolution(series, step):
+        """Pick the coarsest resolution that is still at least as fine as `step`"""
+        chosen = series[0]
+        for resolution in series[1:]:
+            if resolution.step > step:
+                break
+            chosen = resolution
+        return chosen
+    
+    def query(self, server_id, start, end, step):
+        """Aggregate a server's samples between the unix times `start` and `end` into `step`-second buckets
+        
+        Returns (resolution step, points) where each point has the bucket time,
+        min/max/avg online players, the number of samples and the fraction of
+        samples with the server up.
+        """
+        step = max(float(step), 1.0)
+        with self.lock:
+            series = self.series.get(server_id)
+            if series is None:
+                return None, []
+            
+            resolution = self._resolution(series, step)
+            points = []
+            current = None
+            for bucket_time, low, high, total, count, up in resolution.buckets(start - resolution.step, end):
+                bucket = bucket_time - bucket_time % step
+                if current is None or current["time"] != bucket:
+                    current = {"time": bucket, "min": low, "max": high, "sum": total, "samples": count, "up": up}
+                    points.append(current)
+                else:
+                    current["min"] = min(current["min"], low)
+                    current["max"] = max(current["max"], high)
+                    current["sum"] += total
+                    current["samples"] += count
+                    current["up"] += up
+        
+        for point in points:
+            point["avg"] = round(point.pop("sum") / point["samples"], 2)
+            point["uptime"] = round(point.pop("up") / point["samples"], 3)
+        return resolution.step, points
\ No newline at end of file
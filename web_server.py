@@ -3,34 +3,135 @@ import logging
 import threading
 import time
 import json
+import gzip
+import zlib
+import queue
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request
+from heartbeat_buffer import HeartbeatBuffer
+from heartbeat_log import HeartbeatLog
+from metrics import REGISTRY, HEARTBEAT_BUFFER_ENTRIES, LOGS_RESPONSE_CACHE
+from server_status import json_default
+
+try:
+    import orjson
+except ImportError:  # Optional faster encoder, the standard library one is used otherwise
+    orjson = None
 
 # Get logger
 logger = logging.getLogger('minecraft_broadcaster.web_server')
 
+def dumps(obj):
+    """Serialize to compact JSON bytes, with orjson when it is installed
+    
+    Status records in heartbeats are only turned into dicts here, at the API boundary.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':'), default=json_default).encode('utf-8')
+
+def negotiate_encoding(accept_encoding):
+    """Pick "gzip" or "deflate" from an Accept-Encoding header, or None to send the body as is"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    
+    for coding in ("gzip", "deflate"):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+class StreamSubscriber:
+    """A connected event stream client with a bounded queue of pending events"""
+    
+    def __init__(self, max_pending):
+        """Initialize the subscriber's queue"""
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = False
+    
+    def push(self, event):
+        """Queue an event; returns False if the client has fallen behind"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
 class HeartbeatWebServer:
     """Class to run a web server for displaying heartbeat logs"""
     
-    def __init__(self, host="0.0.0.0", port=8080):
-        """Initialize the web server"""
+    def __init__(self, host="0.0.0.0", port=8080, timeseries=None, health=None):
+        """Initialize the web server
+        
+        `timeseries` backs /api/history and `health` (a ServiceHealth) backs
+        /healthz and /readyz.
+        """
         self.host = os.environ.get("WEB_SERVER_HOST", host)
         self.port = int(os.environ.get("WEB_SERVER_PORT", port))
-        self.app = Flask(__name__, 
-                        template_folder=os.environ.get("TEMPLATES_DIR", "templates"))
-        self.heartbeats = []
-        self.max_logs = 1000  # Maximum number of log entries to keep
+        self.template_folder = os.environ.get("TEMPLATES_DIR", "templates")
+        self.app = None  # Flask app, created when the threaded server starts
+        self.max_logs = int(os.environ.get("HEARTBEAT_BUFFER_SIZE", "1000"))  # Maximum number of log entries to keep
+        self.heartbeats = HeartbeatBuffer(self.max_logs)
+        HEARTBEAT_BUFFER_ENTRIES.set_function(self.heartbeats.__len__)
+        
+        # Durable history on disk; the newest entries are restored into the buffer
+        self.history = None
+        history_dir = os.environ.get("HEARTBEAT_LOG_DIR", "")
+        if history_dir:
+            self.history = HeartbeatLog(history_dir)
+            restore = int(os.environ.get("HEARTBEAT_RESTORE", self.max_logs))
+            self.heartbeats.restore(self.history.latest(restore) if restore > 0 else [], self.history.last_seq)
+            logger.info(f"Restored {len(self.heartbeats)} heartbeats from {history_dir}")
+        self.subscribers = set()  # Connected /api/stream clients
+        self.subscribers_lock = threading.Lock()
+        self.stream_queue_size = int(os.environ.get("STREAM_QUEUE_SIZE", "100"))
+        self.stream_keepalive = float(os.environ.get("STREAM_KEEPALIVE", "15"))
+        self.last_update = None  # Time of the last heartbeat or unchanged poll
+        self.timeseries = timeseries
+        self.health = health
+        
+        # Serialized /api/logs bodies by window and encoding, dropped on every heartbeat
+        self.logs_cache = {}
+        self.logs_cache_lock = threading.Lock()
+        self.logs_cache_size = int(os.environ.get("LOGS_CACHE_SIZE", "32"))
+        self.compress_min_size = int(os.environ.get("LOGS_COMPRESS_MIN_SIZE", "1024"))
+        self.compress_level = int(os.environ.get("LOGS_COMPRESSION_LEVEL", "6"))
+        self.cache_hits = LOGS_RESPONSE_CACHE.labels("hit")
+        self.cache_misses = LOGS_RESPONSE_CACHE.labels("miss")
+        # Part of every ETag; sequence ids restart with the process when there is no on-disk history
+        self.etag_epoch = os.urandom(4).hex()
         self.thread = None
         self.running = False
         
-        # Configure routes
-        self._configure_routes()
+        # Serving backend: "waitress" (production WSGI server) or "flask" (development server)
+        self.backend = os.environ.get("WEB_SERVER_BACKEND", "waitress").lower()
+        self.threads = int(os.environ.get("WEB_SERVER_THREADS", "8"))
+        self.keepalive_timeout = int(os.environ.get("WEB_SERVER_KEEPALIVE", "120"))
+        self.server = None
+        
+        # Each open stream holds a worker thread, so leave some for regular requests
+        self.max_stream_clients = int(os.environ.get("MAX_STREAM_CLIENTS", max(1, self.threads // 2)))
         
         logger.info(f"Initialized web server on {self.host}:{self.port}")
-        logger.info(f"Using templates from {self.app.template_folder}")
+        logger.info(f"Using templates from {self.template_folder}")
     
     def _configure_routes(self):
-        """Configure Flask routes"""
+        """Create the Flask app and configure its routes
+        
+        Flask is imported here rather than at module level, so it is only
+        loaded once the threaded server starts, off the main thread.
+        """
+        from flask import Flask, Response, render_template, jsonify, request
+        
+        self.app = Flask(__name__, template_folder=self.template_folder)
+        
         @self.app.route('/')
         def home():
             """Main page with heartbeat logs"""
@@ -38,25 +139,258 @@ class HeartbeatWebServer:
         
         @self.app.route('/api/logs')
         def get_logs():
-            """API endpoint to get logs as JSON"""
+            """API endpoint to get logs as JSON
+            
+            With `since`, only entries with a greater sequence id are returned,
+            so clients can fetch incrementally. `from` and `to` (unix times)
+            select a time range instead. Responses carry an ETag and an
+            unchanged window is answered with 304 Not Modified. Bodies are
+            gzip or deflate compressed when the client accepts it.
+            """
             # Parse query parameters
             limit = request.args.get('limit', default=100, type=int)
-            limit = min(limit, len(self.heartbeats))  # Don't exceed available logs
+            since = request.args.get('since', default=None, type=int)
+            start = request.args.get('from', default=None, type=float)
+            end = request.args.get('to', default=None, type=float)
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+            
+            # Served from the cache while the window is unchanged; the ETag depends
+            # on whether the body actually ended up compressed
+            body, content_encoding = self.logs_body(limit, since, start, end, encoding)
+            etag = self.logs_etag(limit, since, start, end, content_encoding)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
+                if content_encoding:
+                    response.headers['Content-Encoding'] = content_encoding
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.vary.add('Accept-Encoding')
+            return response
+        
+        @self.app.route('/api/stream')
+        def stream():
+            """Server-Sent Events stream pushing each new heartbeat
+            
+            Pass `since` (or the Last-Event-ID header on reconnect) to replay
+            buffered entries newer than that sequence id first.
+            """
+            since = request.headers.get('Last-Event-ID', type=int)
+            if since is None:
+                since = request.args.get('since', default=None, type=int)
+            
+            # Subscribe before replaying so no heartbeat falls in between
+            subscriber = self._subscribe(StreamSubscriber(self.stream_queue_size))
+            if subscriber is None:
+                # The dashboard falls back to polling
+                return Response("Too many stream clients", status=503, headers={'Retry-After': '30'})
             
-            # Return most recent logs first
-            return jsonify({
-                'logs': self.heartbeats[-limit:],
-                'total': len(self.heartbeats)
+            def generate():
+                try:
+                    yield "retry: 5000\n\n"
+                    
+                    last_sent = 0
+                    for seq, event in self.replay_events(since):
+                        last_sent = seq
+                        yield event
+                    
+                    while self.running and not subscriber.dropped:
+                        try:
+                            seq, payload = subscriber.queue.get(timeout=self.stream_keepalive)
+                        except queue.Empty:
+                            yield ": keep-alive\n\n"
+                            continue
+                        
+                        if seq > last_sent:
+                            yield self._format_event(seq, payload)
+                finally:
+                    self._unsubscribe(subscriber)
+            
+            return Response(generate(), mimetype='text/event-stream', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
             })
         
+        @self.app.route('/metrics')
+        def metrics():
+            """Prometheus metrics endpoint"""
+            return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+        
+        @self.app.route('/api/history')
+        def get_history():
+            """API endpoint to get aggregated player counts per server
+            
+            `from` and `to` are unix times (default: the last hour) and `step`
+            the bucket width in seconds (default: 60). Without `server`, all
+            servers are returned.
+            """
+            return jsonify(self.get_history(
+                request.args.get('server', default=None),
+                request.args.get('from', default=None, type=float),
+                request.args.get('to', default=None, type=float),
+                request.args.get('step', default=None, type=float)
+            ))
+        
         @self.app.route('/api/status')
         def get_status():
             """API endpoint to get current status"""
-            return jsonify({
-                'status': 'running' if self.running else 'stopped',
-                'last_update': self.heartbeats[-1]['timestamp'] if self.heartbeats else None,
-                'logs_count': len(self.heartbeats)
-            })
+            return jsonify(self.get_status())
+        
+        @self.app.route('/healthz')
+        def healthz():
+            """Liveness probe: 503 once broadcasting stopped or a controller loop stalled"""
+            alive, payload = self.get_liveness()
+            return jsonify(payload), 200 if alive else 503
+        
+        @self.app.route('/readyz')
+        def readyz():
+            """Readiness probe: 503 until a controller has polled every server in its list"""
+            ready, payload = self.get_readiness()
+            return jsonify(payload), 200 if ready else 503
+    
+    def logs_etag(self, limit, since, start=None, end=None, encoding=None):
+        """ETag for a /api/logs window; it only changes when a heartbeat is added
+        
+        Each content encoding actually applied to the body is a separate
+        representation and gets its own tag; uncompressed bodies share one.
+        Tags from an earlier process never match.
+        """
+        etag = f"{self.etag_epoch}-{self.heartbeats.last_seq}-{since}-{limit}"
+        if start is not None or end is not None:
+            etag += f"-{start}-{end}"
+        if encoding:
+            etag += f"-{encoding}"
+        return etag
+    
+    def logs_body(self, limit, since=None, start=None, end=None, encoding=None):
+        """Serialized /api/logs payload, compressed with `encoding` if it is worth it
+        
+        Returns (body, content encoding or None). Each window is serialized
+        and compressed once and served from the cache until the next heartbeat.
+        """
+        cached = self.cached_logs_body(limit, since, start, end, encoding)
+        if cached is not None:
+            return cached
+        
+        self.cache_misses.inc()
+        key = self.logs_etag(limit, since, start, end)
+        with self.logs_cache_lock:
+            variants = self.logs_cache.get(key, {})
+        if None in variants:
+            body = variants[None][0]
+        else:
+            body = dumps(self.get_logs(limit, since, start, end))
+        
+        result = (body, None)
+        if encoding and len(body) >= self.compress_min_size:
+            if encoding == "gzip":
+                result = (gzip.compress(body, self.compress_level, mtime=0), encoding)
+            else:
+                result = (zlib.compress(body, self.compress_level), encoding)
+        
+        with self.logs_cache_lock:
+            if key not in self.logs_cache and len(self.logs_cache) >= self.logs_cache_size:
+                # Evict the oldest window
+                del self.logs_cache[next(iter(self.logs_cache))]
+            variants = self.logs_cache.setdefault(key, {})
+            variants[None] = (body, None)
+            variants[encoding] = result
+        return result
+    
+    def cached_logs_body(self, limit, since=None, start=None, end=None, encoding=None):
+        """Cached result of logs_body(), or None if the window has to be built first"""
+        key = self.logs_etag(limit, since, start, end)
+        with self.logs_cache_lock:
+            cached = self.logs_cache.get(key, {}).get(encoding)
+        if cached is not None:
+            self.cache_hits.inc()
+        return cached
+    
+    def get_logs(self, limit, since=None, start=None, end=None):
+        """Build the /api/logs payload
+        
+        Returns the newest `limit` entries, those after `since`, or those
+        written between the unix times `start` and `end`. Ranges older than
+        the in-memory buffer are read from the on-disk history.
+        """
+        last_id = self.heartbeats.last_seq
+        if start is not None or end is not None:
+            if self.history:
+                logs = self.history.between(start, end, limit)
+            else:
+                logs = self._buffered_between(start, end, limit)
+        elif since is None:
+            logs = self.heartbeats.latest(limit)
+        elif self.history and self._before_buffer(since, limit):
+            logs = self.history.since(since, limit)
+        else:
+            logs = self.heartbeats.since(since, limit)
+        
+        return {
+            'logs': logs,
+            'total': len(self.heartbeats),
+            'last_id': logs[-1]['id'] if logs else last_id
+        }
+    
+    def _before_buffer(self, since, limit):
+        """Check whether the entries after `since` reach back past the in-memory buffer"""
+        last_seq = self.heartbeats.last_seq
+        first_wanted = since + 1
+        if limit is not None:
+            first_wanted = max(first_wanted, last_seq - max(limit, 0) + 1)
+        return first_wanted < last_seq - len(self.heartbeats) + 1
+    
+    def _buffered_between(self, start, end, limit):
+        """Filter the in-memory buffer by time when there is no on-disk history"""
+        logs = []
+        for entry in self.heartbeats.latest():
+            written = datetime.strptime(entry['timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+            if (start is None or written >= start) and (end is None or written <= end):
+                logs.append(entry)
+        return logs[-limit:] if limit else logs
+    
+    def get_history(self, server_id=None, start=None, end=None, step=None):
+        """Build the /api/history payload from the time series"""
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        step = step or 60
+        
+        servers = {}
+        if self.timeseries is not None:
+            server_ids = [server_id] if server_id else self.timeseries.server_ids()
+            for sid in server_ids:
+                resolution, points = self.timeseries.query(sid, start, end, step)
+                if resolution is not None:
+                    servers[sid] = {'resolution': resolution, 'points': points}
+        
+        return {'from': start, 'to': end, 'step': step, 'servers': servers}
+    
+    def get_status(self):
+        """Build the /api/status payload"""
+        return {
+            'status': 'running' if self.running else 'stopped',
+            'last_update': self.last_update,
+            'logs_count': len(self.heartbeats)
+        }
+    
+    def get_liveness(self):
+        """Build the /healthz payload; returns (alive, payload)"""
+        alive, details = self.health.live() if self.health else (True, {})
+        return alive, dict(details, status='alive' if alive else 'unhealthy')
+    
+    def get_readiness(self):
+        """Build the /readyz payload; returns (ready, payload)"""
+        ready, details = self.health.ready() if self.health else (True, {})
+        return ready, dict(details, status='ready' if ready else 'starting')
+    
+    def replay_events(self, since):
+        """Yield (sequence id, formatted event) for buffered entries newer than `since`"""
+        if since is None:
+            return
+        for entry in self.heartbeats.since(since):
+            yield entry['id'], self._format_event(entry['id'], self._event_payload(entry))
     
     def add_heartbeat(self, data):
         """Add a heartbeat log entry"""
@@ -66,12 +400,60 @@ class HeartbeatWebServer:
             'timestamp': timestamp,
             'data': data
         }
+        self.last_update = timestamp
+        
+        # Oldest entries are overwritten once the buffer is full
+        seq = self.heartbeats.append(log_entry)
+        if self.history:
+            self.history.append(log_entry)
         
-        self.heartbeats.append(log_entry)
+        # Every cached /api/logs window is stale now
+        with self.logs_cache_lock:
+            self.logs_cache.clear()
         
-        # Trim logs if exceeding max size
-        if len(self.heartbeats) > self.max_logs:
-            self.heartbeats = self.heartbeats[-self.max_logs:]
+        # Push to stream subscribers, serializing once for all of them
+        if self.subscribers:
+            self._publish(seq, self._event_payload(log_entry))
+    
+    def touch(self):
+        """Record that a poll completed without anything worth logging"""
+        self.last_update = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    def _event_payload(self, entry):
+        """Serialize a heartbeat for the event stream"""
+        return dumps({
+            'log': entry,
+            'logs_count': len(self.heartbeats)
+        }).decode('utf-8')
+    
+    @staticmethod
+    def _format_event(seq, payload):
+        """Format one Server-Sent Events message"""
+        return f"id: {seq}\nevent: heartbeat\ndata: {payload}\n\n"
+    
+    def _subscribe(self, subscriber):
+        """Register a new stream client; returns None if there are too many"""
+        with self.subscribers_lock:
+            if len(self.subscribers) >= self.max_stream_clients:
+                return None
+            self.subscribers.add(subscriber)
+        return subscriber
+    
+    def _unsubscribe(self, subscriber):
+        """Remove a stream client"""
+        with self.subscribers_lock:
+            self.subscribers.discard(subscriber)
+    
+    def _publish(self, seq, payload):
+        """Queue an event for every subscriber, dropping clients that fall behind"""
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers)
+        
+        for subscriber in subscribers:
+            if not subscriber.push((seq, payload)):
+                logger.warning("Dropping slow event stream client")
+                subscriber.dropped = True
+                self._unsubscribe(subscriber)
     
     def start(self):
         """Start the web server in a separate thread"""
@@ -82,8 +464,8 @@ class HeartbeatWebServer:
         self.running = True
         
         # Check if templates directory exists
-        if not os.path.exists(self.app.template_folder):
-            logger.warning(f"Templates directory {self.app.template_folder} does not exist")
+        if not os.path.exists(self.template_folder):
+            logger.warning(f"Templates directory {self.template_folder} does not exist")
             logger.warning("Creating default templates...")
             self._create_template_files()
         
@@ -94,11 +476,42 @@ class HeartbeatWebServer:
         
         logger.info(f"Web server started on http://{self.host}:{self.port}")
     
+    def stop(self):
+        """Stop the web server"""
+        self.running = False
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        if self.history:
+            self.history.close()
+    
     def _run_server(self):
-        """Run the Flask server"""
+        """Run the web server with the configured backend"""
         try:
-            # In production, you might want to use a proper WSGI server
-            self.app.run(host=self.host, port=self.port, debug=False, use_reloader=False)
+            if self.app is None:
+                self._configure_routes()
+            
+            if self.backend == "waitress":
+                try:
+                    from waitress import create_server
+                except ImportError:
+                    logger.warning("waitress is not installed, falling back to the Flask development server")
+                    self.backend = "flask"
+            
+            if self.backend == "waitress":
+                logger.info(f"Serving with waitress using {self.threads} threads")
+                self.server = create_server(
+                    self.app,
+                    host=self.host,
+                    port=self.port,
+                    threads=self.threads,
+                    channel_timeout=self.keepalive_timeout,
+                    ident="minecraft-broadcaster"
+                )
+                self.server.run()
+            else:
+                logger.info("Serving with the Flask development server")
+                self.app.run(host=self.host, port=self.port, debug=False, use_reloader=False, threaded=True)
         except Exception as e:
             logger.error(f"Error running web server: {e}")
             self.running = False
@@ -106,10 +519,10 @@ class HeartbeatWebServer:
     def _create_template_files(self):
         """Create necessary template files for Flask if they don't exist"""
         # Create templates directory if it doesn't exist
-        os.makedirs(self.app.template_folder, exist_ok=True)
+        os.makedirs(self.template_folder, exist_ok=True)
         
         # Create index.html template if it doesn't exist
-        index_path = os.path.join(self.app.template_folder, 'index.html')
+        index_path = os.path.join(self.template_folder, 'index.html')
         if not os.path.exists(index_path):
             logger.info(f"Creating default index.html template at {index_path}")
             with open(index_path, 'w') as f:
@@ -233,7 +646,7 @@ class HeartbeatWebServer:
                     </tr>
                 </thead>
                 <tbody id="logs-body">
-                    <tr>
+                    <tr class="placeholder">
                         <td colspan="2">Loading logs...</td>
                     </tr>
                 </tbody>
@@ -246,6 +659,9 @@ class HeartbeatWebServer:
         let refreshInterval = 5;
         let refreshTimer = null;
         let logLimit = 100;
+        let lastLogId = 0;  // Sequence id of the newest rendered log
+        let eventSource = null;
+        let streaming = false;  // True while heartbeats are pushed over /api/stream
         
         // DOM elements
         const statusElement = document.getElementById('status');
@@ -258,9 +674,9 @@ class HeartbeatWebServer:
         
         // Initialize
         document.addEventListener('DOMContentLoaded', () => {
-            refreshLogs();
+            // Load the current logs, then switch to push updates
+            refreshLogs().then(startStream);
             updateStatus();
-            startAutoRefresh();
             
             // Event listeners
             refreshButton.addEventListener('click', () => {
@@ -270,21 +686,69 @@ class HeartbeatWebServer:
             
             refreshIntervalSelect.addEventListener('change', (e) => {
                 refreshInterval = parseInt(e.target.value);
-                startAutoRefresh();
+                if (!streaming) {
+                    startAutoRefresh();
+                }
             });
             
             logLimitSelect.addEventListener('change', (e) => {
                 logLimit = parseInt(e.target.value);
+                resetLogs();
                 refreshLogs();
             });
         });
         
         // Functions
-        function startAutoRefresh() {
-            // Clear existing timer
+        function startStream() {
+            if (!window.EventSource) {
+                startAutoRefresh();
+                return;
+            }
+            
+            // Resume from the newest log already on the page
+            eventSource = new EventSource(`/api/stream?since=${lastLogId}`);
+            
+            eventSource.onopen = () => {
+                streaming = true;
+                stopAutoRefresh();
+            };
+            
+            eventSource.addEventListener('heartbeat', (e) => {
+                const message = JSON.parse(e.data);
+                if (message.log.id <= lastLogId) {
+                    return;
+                }
+                renderLogs([message.log]);
+                lastLogId = message.log.id;
+                
+                statusElement.textContent = 'running';
+                statusElement.className = 'active';
+                lastUpdateElement.textContent = message.log.timestamp;
+                logsCountElement.textContent = message.logs_count;
+            });
+            
+            eventSource.onerror = () => {
+                // Fall back to polling and try the stream again later
+                eventSource.close();
+                eventSource = null;
+                streaming = false;
+                refreshLogs();
+                updateStatus();
+                startAutoRefresh();
+                setTimeout(startStream, 30000);
+            };
+        }
+        
+        function stopAutoRefresh() {
             if (refreshTimer) {
                 clearInterval(refreshTimer);
+                refreshTimer = null;
             }
+        }
+        
+        function startAutoRefresh() {
+            // Clear existing timer
+            stopAutoRefresh();
             
             // Start new timer if interval > 0
             if (refreshInterval > 0) {
@@ -309,11 +773,24 @@ class HeartbeatWebServer:
                 });
         }
         
+        function resetLogs() {
+            lastLogId = 0;
+            logsTableBody.innerHTML = '';
+        }
+        
         function refreshLogs() {
-            fetch(`/api/logs?limit=${logLimit}`)
+            // Only fetch entries newer than the ones already on the page
+            return fetch(`/api/logs?limit=${logLimit}&since=${lastLogId}`)
                 .then(response => response.json())
                 .then(data => {
+                    if (data.last_id < lastLogId) {
+                        // Sequence ids went backwards, so the server restarted
+                        resetLogs();
+                        refreshLogs();
+                        return;
+                    }
                     renderLogs(data.logs);
+                    lastLogId = data.last_id;
                 })
                 .catch(error => {
                     console.error('Error fetching logs:', error);
@@ -321,18 +798,20 @@ class HeartbeatWebServer:
         }
         
         function renderLogs(logs) {
+            const placeholder = logsTableBody.querySelector('.placeholder');
+            
             if (!logs.length) {
-                logsTableBody.innerHTML = '<tr><td colspan="2">No logs available</td></tr>';
+                if (!logsTableBody.rows.length) {
+                    logsTableBody.innerHTML = '<tr class="placeholder"><td colspan="2">No logs available</td></tr>';
+                }
                 return;
             }
             
-            // Sort logs by timestamp (newest first)
-            logs.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
-            
-            // Clear table
-            logsTableBody.innerHTML = '';
+            if (placeholder) {
+                placeholder.remove();
+            }
             
-            // Add each log
+            // Logs arrive oldest first; insert each at the top so the newest is first
             logs.forEach(log => {
                 const row = document.createElement('tr');
                 
@@ -358,8 +837,13 @@ class HeartbeatWebServer:
                 row.appendChild(dataCell);
                 
                 // Add row to table
-                logsTableBody.appendChild(row);
+                logsTableBody.insertBefore(row, logsTableBody.firstChild);
             });
+            
+            // Drop the oldest rows beyond the selected limit
+            while (logsTableBody.rows.length > logLimit) {
+                logsTableBody.deleteRow(-1);
+            }
         }
     </script>
 </body>